@@ -4,7 +4,13 @@ import tempfile
 import json
 import base64
 from pathlib import Path
-from asbestos_report_analyzer import AsbestosReportAnalyzer
+from asbestos_report_analyzer import AnnotateurRapport, PlanTileCache, ZoneDangereuse, analyser_televersement
+
+# Cache de tuiles des plans partagé entre les sessions (clé = empreinte de page)
+TILES_DIR = os.path.join(tempfile.gettempdir(), "analyseur_amiante_tiles")
+
+# Zones affichées par page : seuls leurs crops sont générés
+ZONES_PAR_PAGE = 10
 
 # --- CONFIGURATION ET STYLE ---
 st.set_page_config(page_title="Analyseur Amiante MVP", page_icon="⚠️", layout="wide")
@@ -36,77 +42,160 @@ st.markdown('<div class="header-custom"><h1>⚠️ Analyseur de Rapports Amiante
 
 uploaded_file = st.file_uploader("Glissez-déposez votre rapport PDF ici", type="pdf")
 
+
+def empreinte_plan(page_plan):
+    """Pyramide de tuiles d'une page de plan, générée à la première ouverture de son explorateur"""
+    tuiles = st.session_state.setdefault('plan_tiles', {})
+    if page_plan not in tuiles:
+        import fitz
+        with st.spinner(f"Préparation des tuiles du plan page {page_plan}..."):
+            with fitz.open(stream=st.session_state['pdf_analyse'], filetype="pdf") as doc:
+                tuiles[page_plan] = PlanTileCache(TILES_DIR).generer_pyramide(doc[page_plan - 1])
+    return tuiles[page_plan]
+
+
+def afficher_explorateur_plan(zone):
+    """Pan/zoom sur le plan à partir des tuiles en cache, zone encadrée"""
+    if not zone.get('plan_page') or not zone.get('plan_bbox'):
+        return
+    
+    cle = f"{zone['id_zone']}_{zone['plan_page']}"
+    if not st.toggle(f"🔎 Explorer le plan (page {zone['plan_page']})", key=f"explorer_{cle}"):
+        return
+    
+    cache = PlanTileCache(TILES_DIR)
+    empreinte = empreinte_plan(zone['plan_page'])
+    meta = cache.lire_meta(empreinte)
+    page_w, page_h = meta['page_rect']
+    x0, y0, x1, y1 = zone['plan_bbox']
+    
+    niveau = st.slider("Zoom", 0, len(meta['niveaux']) - 1, len(meta['niveaux']) - 1, key=f"zoom_{cle}")
+    c_x, c_y = st.columns(2)
+    cx = c_x.slider("Horizontal", 0.0, float(page_w), float((x0 + x1) / 2), key=f"pan_x_{cle}")
+    cy = c_y.slider("Vertical", 0.0, float(page_h), float((y0 + y1) / 2), key=f"pan_y_{cle}")
+    vue = cache.assembler_vue(
+        empreinte, niveau, (cx, cy),
+        surlignage=tuple(zone['plan_bbox']),
+        label=f"ZONE {zone['id_zone']}"
+    )
+    st.image(vue, caption=f"Plan page {zone['plan_page']} - Zone {zone['id_zone']}")
+
+
+# Les résultats en session appartiennent au fichier analysé : un autre fichier
+# (ou aucun) les invalide, pour ne jamais afficher les zones d'un autre rapport
+fichier_courant = None
+if uploaded_file is not None:
+    fichier_courant = getattr(uploaded_file, 'file_id', None) or (uploaded_file.name, uploaded_file.size)
+if st.session_state.get('fichier_analyse') != fichier_courant:
+    for cle_session in ('results', 'rapport_annote', 'fichier_analyse', 'pdf_analyse', 'plan_tiles'):
+        st.session_state.pop(cle_session, None)
+
 if uploaded_file is not None:
     st.info(f"Fichier prêt : {uploaded_file.name}")
     
     if st.button("🔍 LANCER L'ANALYSE DU DOCUMENT"):
-        # Utilisation d'un dossier temporaire pour les sorties (PDF, Crops, JSON)
-        with tempfile.TemporaryDirectory() as tmpdirname:
-            input_path = os.path.join(tmpdirname, uploaded_file.name)
-            with open(input_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
+        # Résultats conservés en session pour que les interactions (zoom, pan)
+        # ne relancent pas l'analyse
+        for cle_session in ('results', 'rapport_annote', 'pdf_analyse', 'plan_tiles'):
+            st.session_state.pop(cle_session, None)
+        st.session_state['page_zones'] = 1
+        
+        with st.spinner("Analyse du rapport en cours... Extraction des zones et des plans."):
+            try:
+                # Analyse directe des octets uploadés : ni fichier temporaire, ni sorties disque.
+                # Les octets analysés restent en session pour les tuiles des plans
+                contenu = uploaded_file.getvalue()
+                st.session_state['results'] = analyser_televersement(contenu, uploaded_file.name)
+                st.session_state['pdf_analyse'] = contenu
+                st.session_state['fichier_analyse'] = fichier_courant
+            except Exception as e:
+                st.error(f"Une erreur technique est survenue : {str(e)}")
+                st.info("Détails pour le débug : assurez-vous que toutes les dépendances (PyMuPDF, pdfplumber) sont installées.")
+
+results = st.session_state.get('results')
+
+if uploaded_file is not None and results is not None:
+    if "error" in results:
+        st.error(f"Erreur : {results['error']}")
+    else:
+        # 1. AFFICHAGE DES STATS (Adapté à tes clés : zones_count, zones_with_plan)
+        st.markdown("### 📊 Résultats de l'analyse")
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Zones détectées", results['zones_count'])
+        c2.metric("Localisées sur plan", results['zones_with_plan'])
+        c3.metric("Statut", "✅ Terminé")
+
+        # 2. LISTE DES ZONES
+        st.markdown("### 📍 Zones identifiées")
+        zones = results['zones']
+        nb_pages = max(1, -(-len(zones) // ZONES_PAR_PAGE))
+        page_zones = 1
+        if nb_pages > 1:
+            page_zones = st.number_input(f"Page (sur {nb_pages})", min_value=1, max_value=nb_pages,
+                                         step=1, key="page_zones")
+        debut = (page_zones - 1) * ZONES_PAR_PAGE
+        zones_visibles = zones[debut:debut + ZONES_PAR_PAGE]
+        if nb_pages > 1:
+            st.caption(f"Zones {debut + 1} à {debut + len(zones_visibles)} sur {len(zones)}")
+        
+        for zone in zones_visibles:
+            # Détermination de la classe CSS selon le risque
+            is_crit = "critical" if zone.get('risque_niveau') == "CRITIQUE" else ""
             
-            with st.spinner("Analyse du rapport en cours... Extraction des zones et des plans."):
-                try:
-                    # Initialisation et Analyse (en utilisant ton orchestrateur)
-                    analyzer = AsbestosReportAnalyzer(input_path, output_dir=tmpdirname)
-                    results = analyzer.analyser()
-                    
-                    if "error" in results:
-                        st.error(f"Erreur : {results['error']}")
-                    else:
-                        # 1. AFFICHAGE DES STATS (Adapté à tes clés : zones_count, zones_with_plan)
-                        st.markdown("### 📊 Résultats de l'analyse")
-                        c1, c2, c3 = st.columns(3)
-                        c1.metric("Zones détectées", results['zones_count'])
-                        c2.metric("Localisées sur plan", results['zones_with_plan'])
-                        c3.metric("Statut", "✅ Terminé")
-
-                        # 2. LISTE DES ZONES
-                        st.markdown("### 📍 Zones identifiées")
-                        for zone in results['zones']:
-                            # Détermination de la classe CSS selon le risque
-                            is_crit = "critical" if zone.get('risque_niveau') == "CRITIQUE" else ""
-                            
-                            with st.container():
-                                st.markdown(f"""
-                                    <div class="zone-card {is_crit}">
-                                        <h3 style="margin-top:0;">🔴 ZONE {zone['id_zone']} - {zone.get('risque_niveau', 'ÉLEVÉ')}</h3>
-                                        <p><span class="label-custom">📍 Localisation :</span> {zone['localisation_texte']}</p>
-                                        <p><span class="label-custom">🧱 Matériau :</span> {zone['materiau']}</p>
-                                        <p><span class="label-custom">⚠️ État :</span> {zone['etat']}</p>
-                                        <p><span class="label-custom">📄 Source :</span> Page {zone['page_source']}</p>
-                                    </div>
-                                """, unsafe_allow_html=True)
-                                
-                                # Si ton script a généré un crop, on peut l'afficher ici
-                                if zone.get('plan_crop_path') and os.path.exists(zone['plan_crop_path']):
-                                    st.image(zone['plan_crop_path'], caption=f"Localisation Plan - Zone {zone['id_zone']}", width=400)
-
-                        # 3. TÉLÉCHARGEMENTS
-                        st.markdown("---")
-                        st.markdown("### 💾 Télécharger les documents")
-                        col_pdf, col_json = st.columns(2)
-                        
-                        # Téléchargement PDF
-                        if os.path.exists(results['pdf_output']):
-                            with open(results['pdf_output'], "rb") as f:
-                                col_pdf.download_button(
-                                    label="📑 Télécharger la Fiche Réflexe PDF",
-                                    data=f,
-                                    file_name="fiche_reflexe_amiante.pdf",
-                                    mime="application/pdf"
-                                )
-                        
-                        # Téléchargement JSON
-                        json_data = json.dumps(results['zones'], indent=2, ensure_ascii=False)
-                        col_json.download_button(
-                            label="📊 Télécharger les données JSON",
-                            data=json_data,
-                            file_name="export_zones.json",
-                            mime="application/json"
-                        )
-
-                except Exception as e:
-                    st.error(f"Une erreur technique est survenue : {str(e)}")
-                    st.info("Détails pour le débug : assurez-vous que toutes les dépendances (PyMuPDF, pdfplumber) sont installées.")
+            with st.container():
+                st.markdown(f"""
+                    <div class="zone-card {is_crit}">
+                        <h3 style="margin-top:0;">🔴 ZONE {zone['id_zone']} - {zone.get('risque_niveau', 'ÉLEVÉ')}</h3>
+                        <p><span class="label-custom">📍 Localisation :</span> {zone['localisation_texte']}</p>
+                        <p><span class="label-custom">🧱 Matériau :</span> {zone['materiau']}</p>
+                        <p><span class="label-custom">⚠️ État :</span> {zone['etat']}</p>
+                        <p><span class="label-custom">📄 Source :</span> Page {zone['page_source']}</p>
+                    </div>
+                """, unsafe_allow_html=True)
+                
+                # Crop rendu au premier affichage de la zone puis mémorisé
+                crop = results['artifacts']['crops'].get(zone['id_zone'])
+                if crop:
+                    # Crop éventuellement partagé avec des zones voisines : la légende désigne le cadre
+                    st.image(crop, caption=f"Localisation Plan - Zone {zone['id_zone']} (cadre « ZONE {zone['id_zone']} »)",
+                             width=400)
+                
+                afficher_explorateur_plan(zone)
+
+        # 3. TÉLÉCHARGEMENTS
+        st.markdown("---")
+        st.markdown("### 💾 Télécharger les documents")
+        col_pdf, col_json, col_annote = st.columns(3)
+        
+        # Téléchargement PDF
+        if results['artifacts']['pdf']:
+            col_pdf.download_button(
+                label="📑 Télécharger la Fiche Réflexe PDF",
+                data=results['artifacts']['pdf'],
+                file_name="fiche_reflexe_amiante.pdf",
+                mime="application/pdf"
+            )
+        
+        # Téléchargement JSON
+        col_json.download_button(
+            label="📊 Télécharger les données JSON",
+            data=results['artifacts']['json'],
+            file_name="export_zones.json",
+            mime="application/json"
+        )
+        
+        # Rapport original annoté : préparé à la demande (sauvegarde incrémentale du PDF d'origine)
+        if 'rapport_annote' not in st.session_state:
+            if col_annote.button("🖍️ Préparer le rapport original annoté"):
+                with st.spinner("Annotation du rapport original..."):
+                    # Les octets analysés, pas ceux du téléversement courant : les zones leur correspondent
+                    zones = [ZoneDangereuse(**zone) for zone in results['zones']]
+                    st.session_state['rapport_annote'] = AnnotateurRapport(st.session_state['pdf_analyse'], None).annoter(zones)
+                st.rerun()
+        else:
+            col_annote.download_button(
+                label="🖍️ Télécharger le rapport annoté",
+                data=st.session_state['rapport_annote'],
+                file_name=f"annote_{uploaded_file.name}",
+                mime="application/pdf"
+            )
@@ -19,26 +19,20 @@ AMÉLIORATIONS v1.1.0:
 
 import json
 import re
-from dataclasses import dataclass, asdict
-from typing import List, Dict, Optional, Tuple
+from contextlib import contextmanager
+from functools import lru_cache
+from collections.abc import Mapping
+from dataclasses import dataclass, asdict, field
+from typing import List, Dict, Optional, Tuple, Iterable, Union, BinaryIO
 from pathlib import Path
-import logging
-
-# Imports PDF
-import pdfplumber
-import fitz  # PyMuPDF pour manipulation avancée des images et coordonnées
-
-# Imports Image Processing
-from PIL import Image, ImageDraw, ImageFont
 import io
+import logging
+import os
+import time
 
-# Imports pour génération de rapport
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import mm
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as RLImage, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_LEFT, TA_CENTER
+# Les bibliothèques lourdes (pdfplumber, PyMuPDF, Pillow, reportlab) sont
+# importées à la demande dans chaque étape : un run "extract" seul ne charge
+# ni reportlab ni Pillow.
 
 # Configuration du logging
 logging.basicConfig(
@@ -48,6 +42,171 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# Étapes du pipeline, dans l'ordre d'exécution
+ETAPES = ("extract", "link", "crop", "report")
+
+# Étapes requises par chaque étape (ajoutées automatiquement si absentes)
+DEPENDANCES_ETAPES = {
+    "extract": (),
+    "link": ("extract",),
+    "crop": ("link",),
+    "report": ("extract",),
+}
+
+
+def normaliser_etapes(etapes: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
+    """
+    Valide une sélection d'étapes et ajoute leurs dépendances.
+
+    Args:
+        etapes: Noms d'étapes (ex: ["extract", "link"]) ou chaîne "extract,link".
+            None = pipeline complet.
+
+    Returns:
+        Tuple des étapes à exécuter, dans l'ordre du pipeline
+
+    Raises:
+        ValueError: Si une étape est inconnue
+    """
+    if etapes is None:
+        return ETAPES
+    if isinstance(etapes, str):
+        etapes = etapes.split(",")
+
+    demandees = {e.strip().lower() for e in etapes if e and e.strip()}
+    inconnues = demandees - set(ETAPES)
+    if inconnues:
+        raise ValueError(
+            f"Étape(s) inconnue(s): {', '.join(sorted(inconnues))} "
+            f"(valeurs possibles: {', '.join(ETAPES)})"
+        )
+
+    a_traiter = list(demandees)
+    while a_traiter:
+        for dep in DEPENDANCES_ETAPES[a_traiter.pop()]:
+            if dep not in demandees:
+                logger.info(f"Étape '{dep}' ajoutée (dépendance)")
+                demandees.add(dep)
+                a_traiter.append(dep)
+
+    return tuple(e for e in ETAPES if e in demandees)
+
+
+# ============================================================================
+# SOURCE PDF (FICHIER OU MÉMOIRE)
+# ============================================================================
+
+# Un rapport peut être fourni par chemin ou directement en mémoire (upload)
+SourcePDF = Union[str, Path, bytes, bytearray, memoryview, BinaryIO]
+
+
+def charger_source_pdf(source: SourcePDF) -> Union[str, bytes]:
+    """
+    Normalise une source PDF : chemin → str, contenu en mémoire → bytes.
+    
+    Les bytes retournés sont partagés tels quels par toutes les étapes
+    (PyMuPDF et pdfplumber lisent le même buffer, sans fichier temporaire).
+    bytes et BytesIO ne sont pas copiés ; bytearray/memoryview le sont une fois.
+    """
+    if isinstance(source, (str, Path)):
+        return str(source)
+    if isinstance(source, bytes):
+        return source
+    if isinstance(source, (bytearray, memoryview)):
+        return bytes(source)
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    if hasattr(source, "read"):
+        return source.read()
+    raise TypeError(f"Source PDF non supportée: {type(source).__name__}")
+
+
+def ouvrir_fitz(source: SourcePDF):
+    """Ouvre la source avec PyMuPDF (depuis la mémoire si besoin)"""
+    import fitz
+    
+    source = charger_source_pdf(source)
+    if isinstance(source, bytes):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+
+def ouvrir_pdfplumber(source: SourcePDF):
+    """Ouvre la source avec pdfplumber (BytesIO partageant le buffer si en mémoire)"""
+    import pdfplumber
+    
+    source = charger_source_pdf(source)
+    if isinstance(source, bytes):
+        return pdfplumber.open(io.BytesIO(source))
+    return pdfplumber.open(source)
+
+
+# ============================================================================
+# BUDGETS DE TEMPS ET DÉGRADATIONS
+# ============================================================================
+
+class BudgetTemps:
+    """
+    Budgets de temps d'une analyse (document entier et par page).
+    
+    Les budgets sont coopératifs : chaque étape les consulte avant une opération
+    coûteuse et bascule sur un chemin moins cher (pas de mode layout, DPI réduit,
+    crops ignorés...). Chaque dégradation appliquée est journalisée dans
+    self.degradations et remontée dans le résultat de l'analyse. Un appel
+    PyMuPDF déjà lancé n'est pas interrompu.
+    
+    Les résultats obtenus en mode dégradé (pages extraites sans layout, crops
+    à DPI réduit) sont notés dans self.degrades : ils ne sont pas conservés
+    par le store incrémental et seront recalculés à la prochaine analyse.
+    """
+    
+    def __init__(self, document_s: Optional[float] = None, page_s: Optional[float] = None):
+        self.document_s = document_s
+        self.page_s = page_s
+        self.debut = time.monotonic()
+        self.degradations: List[Dict] = []
+        self.degrades: Dict[str, set] = {}  # {étape: pages ou zones au résultat dégradé}
+        self._vues = set()
+    
+    def ecoule(self) -> float:
+        return time.monotonic() - self.debut
+    
+    def fraction_consommee(self) -> float:
+        """Part du budget document consommée (0 si illimité)"""
+        if not self.document_s:
+            return 0.0
+        return self.ecoule() / self.document_s
+    
+    def epuise(self) -> bool:
+        return self.fraction_consommee() >= 1.0
+    
+    def depasse_page(self, duree: float) -> bool:
+        return self.page_s is not None and duree > self.page_s
+    
+    def marquer_degrade(self, etape: str, cle):
+        """Note un résultat (page, zone) obtenu en mode dégradé"""
+        self.degrades.setdefault(etape, set()).add(cle)
+    
+    def est_degrade(self, etape: str, cle) -> bool:
+        return cle in self.degrades.get(etape, ())
+    
+    def degrader(self, etape: str, action: str, page: Optional[int] = None, detail: str = ""):
+        """Journalise une dégradation (une seule fois par étape/action/page)"""
+        cle = (etape, action, page)
+        if cle in self._vues:
+            return
+        self._vues.add(cle)
+        self.degradations.append({
+            "etape": etape,
+            "action": action,
+            "page": page,
+            "detail": detail,
+            "ecoule_s": round(self.ecoule(), 3),
+        })
+        cible = f" (page {page})" if page else ""
+        logger.warning(f"⚠ Budget: {etape} → {action}{cible} {detail}".rstrip())
+
+
 # ============================================================================
 # STRUCTURES DE DONNÉES
 # ============================================================================
@@ -66,10 +225,72 @@ class ZoneDangereuse:
     plan_page: Optional[int] = None
     plan_bbox: Optional[Tuple[float, float, float, float]] = None  # (x0, y0, x1, y1)
     plan_crop_path: Optional[str] = None
+    plan_piece: Optional[str] = None  # Libellé de pièce le plus proche sur le plan
+    
+    def to_dict(self) -> Dict:
+        """Conversion en dictionnaire pour JSON"""
+        return asdict(self)
+
+
+@dataclass
+class PageProbe:
+    """Structure d'une page relevée par probe() (sans extraction ni rendu)"""
+    page: int
+    paysage: bool
+    a_couche_texte: bool  # Polices référencées : texte extractible
+    images: int
+    octets_contenu: int  # Taille brute (compressée) des flux de contenu : poids vectoriel estimé
+    plan_probable: bool
+
+
+@dataclass
+class ReportProbe:
+    """Résultat du sondage pré-analyse d'un rapport"""
+    total_pages: int
+    chiffre: bool
+    couverture_texte: float  # Part des pages avec couche texte
+    pages_plans_estimees: List[int]
+    classe_cout: str  # "leger", "moyen", "lourd" ou "bloque" (chiffré)
+    duree_ms: float
+    pages: List[PageProbe]
+    
+    def to_dict(self) -> Dict:
+        """Conversion en dictionnaire pour JSON"""
+        return asdict(self)
+
+
+@dataclass
+class ResultatPartiel:
+    """
+    Résultat sérialisable de l'analyse d'une plage de pages (shard).
+    
+    Les résultats partiels couvrant tout le document se fusionnent avec
+    AsbestosReportAnalyzer.analyser(partiels=...) en un résultat identique à
+    celui d'une analyse sur un seul nœud.
+    """
+    premiere_page: int  # 1-based, incluse
+    derniere_page: int
+    total_pages: int
+    profil: str
+    zones_par_page: Dict[int, List[Dict]]  # Zones extraites, avant liaison aux plans
+    index_plans: Dict[int, Dict[str, Dict]]  # {page de plan: {jeton ID: {"bbox", "piece"}}}
+    pages: Dict[int, Dict]  # {page: {"empreinte", "est_plan", "zones"}}
+    degradations: List[Dict] = field(default_factory=list)
     
     def to_dict(self) -> Dict:
         """Conversion en dictionnaire pour JSON"""
         return asdict(self)
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ResultatPartiel":
+        """Relecture d'un résultat JSON (clés de pages redevenues entières)"""
+        par_page = lambda valeurs: {int(page): valeur for page, valeur in valeurs.items()}
+        return cls(**{
+            **data,
+            "zones_par_page": par_page(data["zones_par_page"]),
+            "index_plans": par_page(data["index_plans"]),
+            "pages": par_page(data["pages"]),
+        })
 
 
 @dataclass
@@ -86,6 +307,105 @@ class ReportMetadata:
 # ÉTAPE 1 : EXTRACTION TEXTUELLE STRUCTURÉE
 # ============================================================================
 
+@dataclass(frozen=True)
+class ProfilLaboratoire:
+    """
+    Format d'identifiants de prélèvements propre à un laboratoire / diagnostiqueur.
+    
+    Les patterns sont compilés une fois ; seuls ceux du profil détecté (ou imposé)
+    sont appliqués aux lignes du rapport.
+    """
+    nom: str
+    signatures: Tuple[re.Pattern, ...]  # Détection sur le texte des premières pages
+    patterns_id: Tuple[Tuple[re.Pattern, str], ...]  # (regex, gabarit de l'ID normalisé)
+    exclusions: Tuple[re.Pattern, ...] = ()  # Contextes de faux positifs (format A4, RT2012...)
+    enseignes: Tuple[re.Pattern, ...] = ()  # Nom du laboratoire : décisif s'il apparaît
+    
+    def cite_enseigne(self, texte: str) -> bool:
+        return any(enseigne.search(texte) for enseigne in self.enseignes)
+    
+    def score(self, texte: str) -> int:
+        """Nombre d'occurrences des signatures du profil dans le texte"""
+        return sum(len(signature.findall(texte)) for signature in self.signatures)
+    
+    def trouver_id(self, ligne: str) -> Optional[str]:
+        """
+        Premier ID de la ligne selon les patterns du profil, par ordre de priorité.
+        Un ID pris dans un contexte d'exclusion (format A4...) cède la place aux
+        autres IDs de la ligne ; s'il est le seul, il est écarté avec un avertissement.
+        """
+        contextes = [match.span() for exclusion in self.exclusions for match in exclusion.finditer(ligne)]
+        ecartes = []
+        for pattern, gabarit in self.patterns_id:
+            for match in pattern.finditer(ligne):
+                id_zone = gabarit.format(*match.groups())
+                if any(debut <= match.start() and match.end() <= fin for debut, fin in contextes):
+                    ecartes.append(id_zone)
+                else:
+                    return id_zone
+        if ecartes:
+            logger.warning(f"Profil {self.nom}: seul(s) ID(s) de la ligne écarté(s) "
+                           f"({', '.join(ecartes)}, contexte d'exclusion) : {ligne.strip()[:80]}")
+        return None
+
+
+def _compiler(*patterns: str, flags: int = 0) -> Tuple[re.Pattern, ...]:
+    return tuple(re.compile(p, flags) for p in patterns)
+
+
+PROFILS_LABORATOIRES: Dict[str, ProfilLaboratoire] = {
+    # "002EW675245 n°49 - 1 (P49)" - Prélèvement positif/négatif
+    "institut_galile": ProfilLaboratoire(
+        nom="institut_galile",
+        signatures=_compiler(r"pr[ée]l[èe]vement\s+(?:positif|n[ée]gatif)", r"\(P\d+\)", flags=re.IGNORECASE),
+        enseignes=_compiler(r"institut\s+galil[ée]e?", flags=re.IGNORECASE),
+        patterns_id=(
+            (re.compile(r"\(P(\d+)\)", re.IGNORECASE), "P{0}"),
+            (re.compile(r"n[°º]\s*(\d+)", re.IGNORECASE), "P{0}"),
+        ),
+    ),
+    # Tableaux de repérage avec IDs préfixés (P076, Z-12, LOCAL-04)
+    "standard": ProfilLaboratoire(
+        nom="standard",
+        signatures=_compiler(r"\bLOCAL[-_]\d+\b", r"\bZ[-_]\d{1,3}\b", r"\bP\d{3}\b"),
+        patterns_id=(
+            (re.compile(r"\b(LOCAL[-_]\d+)\b"), "{0}"),
+            (re.compile(r"\b(Z[-_]?\d{1,3})\b"), "{0}"),
+            (re.compile(r"\b(P\d{2,4})\b"), "{0}"),
+        ),
+    ),
+    # Repli : motif large, débarrassé des faux positifs les plus fréquents
+    "generique": ProfilLaboratoire(
+        nom="generique",
+        signatures=(),
+        patterns_id=((re.compile(r"\b([A-Z]{1,2}[- _]?\d{1,4})\b"), "{0}"),),
+        exclusions=_compiler(
+            r"\b(?:format|papier|feuille|impression)\s+A[0-5]\b",
+            r"\bA[0-5]\s+(?:paysage|portrait)\b",
+            r"\bRT[- _]?\d{4}\b",
+            flags=re.IGNORECASE,
+        ),
+    ),
+}
+
+PROFIL_PAR_DEFAUT = "generique"
+
+
+def detecter_profil(texte: str) -> ProfilLaboratoire:
+    """
+    Profil du laboratoire nommé dans le texte ; à défaut, celui dont les
+    signatures apparaissent le plus (générique sinon).
+    """
+    nommes = [profil for profil in PROFILS_LABORATOIRES.values() if profil.cite_enseigne(texte)]
+    candidats = nommes or list(PROFILS_LABORATOIRES.values())
+    meilleur, meilleur_score = (nommes[0] if nommes else PROFILS_LABORATOIRES[PROFIL_PAR_DEFAUT]), 0
+    for profil in candidats:
+        score = profil.score(texte)
+        if score > meilleur_score:
+            meilleur, meilleur_score = profil, score
+    return meilleur
+
+
 class TextExtractor:
     """
     Responsable de l'extraction intelligente du texte depuis le PDF.
@@ -142,18 +462,50 @@ class TextExtractor:
         "mca",  # Matériau Contenant de l'Amiante
     ]
     
-    def __init__(self, pdf_path: str):
-        self.pdf_path = pdf_path
+    # Nombre de pages lues pour détecter le format du laboratoire
+    PAGES_DETECTION_PROFIL = 3
+    
+    def __init__(self, pdf_path: SourcePDF, budget: Optional[BudgetTemps] = None,
+                 profil: Optional[str] = None):
+        """
+        Args:
+            pdf_path: Chemin du rapport ou contenu PDF en mémoire
+            budget: Budgets de temps (mode layout abandonné si serré ou après une page lente)
+            profil: Nom du profil laboratoire imposé (None = détection automatique)
+        
+        Raises:
+            ValueError: Si le profil imposé est inconnu
+        """
+        if profil is not None and profil not in PROFILS_LABORATOIRES:
+            raise ValueError(
+                f"Profil laboratoire inconnu: {profil} "
+                f"(valeurs possibles: {', '.join(PROFILS_LABORATOIRES)})"
+            )
+        self.pdf_path = charger_source_pdf(pdf_path)
         self.pdf = None
+        self.budget = budget
+        self._layout_abandonne = False  # Mode layout coupé pour le reste du document
+        self.profil = PROFILS_LABORATOIRES[profil] if profil else None
         
     def __enter__(self):
-        self.pdf = pdfplumber.open(self.pdf_path)
+        self.pdf = ouvrir_pdfplumber(self.pdf_path)
         return self
         
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self.pdf:
             self.pdf.close()
     
+    def profil_actif(self) -> ProfilLaboratoire:
+        """Profil imposé, ou détecté au premier appel sur le texte des premières pages"""
+        if self.profil is None:
+            texte = "\n".join(
+                page.extract_text() or ""
+                for page in self.pdf.pages[:self.PAGES_DETECTION_PROFIL]
+            )
+            self.profil = detecter_profil(texte)
+            logger.info(f"Profil laboratoire détecté: {self.profil.nom}")
+        return self.profil
+    
     def est_page_pertinente(self, page_num: int, text: str) -> bool:
         """
         Détermine si une page contient des informations pertinentes.
@@ -226,28 +578,11 @@ class TextExtractor:
         if not est_positif or est_negatif:
             return None
         
-        # Extraction de l'ID de zone
-        # NOUVEAU: Support format Institut Galilé: "002EW675245 n°49 - 1 (P49)"
-        id_zone = None
-        
-        # Priorité 1: Format (PXX) - Institut Galilé
-        match = re.search(r'\(P(\d+)\)', row_text, re.IGNORECASE)
-        if match:
-            id_zone = f"P{match.group(1)}"
-        
-        # Priorité 2: Format n°XX
-        if not id_zone:
-            match = re.search(r'n[°º]\s*(\d+)', row_text, re.IGNORECASE)
-            if match:
-                id_zone = f"P{match.group(1)}"
-        
-        # Priorité 3: Formats standards (P076, Z-12, LOCAL-04, etc.)
-        if not id_zone:
-            for cell in row[:3]:
-                match = re.search(r'\b([A-Z]+[\-_]?\d+|P\d+|Z\d+|LOCAL[\-_]\d+)\b', cell, re.IGNORECASE)
-                if match:
-                    id_zone = match.group(1).upper()
-                    break
+        # Extraction de l'ID de zone selon le format du laboratoire
+        # (ex. Institut Galilé: "002EW675245 n°49 - 1 (P49)" → P49)
+        id_zone = self.profil_actif().trouver_id(" ".join(row))
+        if id_zone:
+            id_zone = id_zone.upper()
         
         if not id_zone:
             logger.debug(f"Ligne positive mais ID zone non trouvé: {row}")
@@ -285,68 +620,311 @@ class TextExtractor:
         logger.info(f"✓ Zone dangereuse détectée: {zone.id_zone} - {zone.localisation_texte}")
         return zone
     
-    def extraire_zones_dangereuses(self) -> List[ZoneDangereuse]:
-        """Extraction ultra-tolérante par scan de texte brut."""
+    def extraire_zones_page(self, page, page_num: int) -> List[ZoneDangereuse]:
+        """Scan de texte brut d'une page (numérotation 1-based)."""
         zones = []
         KEYWORDS_DANGER = ["amiante", "présence", "positif", "détecté", "amianté", "contient"]
         
-        logger.info("Scan global du texte par page...")
+        # Extraction avec layout=True pour garder la structure visuelle, sauf si
+        # la moitié du budget document est consommée ou si une page a dépassé
+        # le budget par page
+        layout = not self._layout_abandonne
+        if layout and self.budget and self.budget.fraction_consommee() >= 0.5:
+            layout = False
+            self._layout_abandonne = True
+            self.budget.degrader("extract", "layout désactivé", detail=f"à partir de la page {page_num}")
+        
+        if not layout:
+            self.budget.marquer_degrade("extract", page_num)
+        
+        debut = time.monotonic()
+        text = page.extract_text(layout=layout)
+        duree = time.monotonic() - debut
+        if layout and self.budget and self.budget.depasse_page(duree):
+            self._layout_abandonne = True
+            self.budget.degrader("extract", "layout désactivé",
+                                 detail=f"après la page lente {page_num} ({duree:.1f} s)")
+        if not text:
+            return zones
 
-        for page_num, page in enumerate(self.pdf.pages, start=1):
-            # Extraction avec layout=True pour garder la structure visuelle
-            text = page.extract_text(layout=True)
-            if not text:
+        profil = self.profil_actif()
+        lines = text.split('\n')
+        for line in lines:
+            line_lower = line.lower()
+            
+            # Seules les lignes avec un mot de danger peuvent désigner une zone
+            if not any(k in line_lower for k in KEYWORDS_DANGER):
                 continue
-
-            lines = text.split('\n')
-            for line in lines:
-                line_lower = line.lower()
-                
-                # Regex pour trouver l'ID (ex: P076, Z-12)
-                match_id = re.search(r'\b([A-Z]{1,2}[- _]?\d{1,4})\b', line)
-                
-                if match_id:
-                    id_found = match_id.group(1)
-                    
-                    # Si ID + mot de danger sur la même ligne
-                    if any(k in line_lower for k in KEYWORDS_DANGER):
-                        zone = ZoneDangereuse(
-                            id_zone=id_found,
-                            localisation_texte=line.strip()[:120],
-                            materiau="Identifié par scan texte",
-                            etat="Voir rapport",
-                            page_source=page_num,
-                            risque_niveau="CRITIQUE" if "dégradé" in line_lower else "ÉLEVÉ"
-                        )
-                        zones.append(zone)
-                        logger.info(f"✓ Zone identifiée : {id_found} à la page {page_num}")
-
-        # Nettoyage des doublons
+            
+            # ID selon les patterns du profil laboratoire (ex: P076, Z-12, (P49))
+            id_found = profil.trouver_id(line)
+            if not id_found and profil.nom != PROFIL_PAR_DEFAUT:
+                # Ligne positive hors du format du profil : repli sur le motif générique
+                id_found = PROFILS_LABORATOIRES[PROFIL_PAR_DEFAUT].trouver_id(line)
+                if id_found:
+                    logger.warning(
+                        f"⚠ Page {page_num}: ligne positive sans ID au format {profil.nom}, "
+                        f"ID générique retenu: {id_found} ({line.strip()[:80]})"
+                    )
+            
+            if id_found:
+                zone = ZoneDangereuse(
+                    id_zone=id_found,
+                    localisation_texte=line.strip()[:120],
+                    materiau="Identifié par scan texte",
+                    etat="Voir rapport",
+                    page_source=page_num,
+                    risque_niveau="CRITIQUE" if "dégradé" in line_lower else "ÉLEVÉ"
+                )
+                zones.append(zone)
+                logger.info(f"✓ Zone identifiée : {id_found} à la page {page_num}")
+            else:
+                logger.debug(f"Page {page_num}: ligne positive sans ID: {line.strip()[:80]}")
+        
+        return zones
+    
+    def extraire_zones_par_page(self, pages: Optional[Iterable[int]] = None) -> Dict[int, List[ZoneDangereuse]]:
+        """
+        Extraction page par page.
+        
+        Args:
+            pages: Numéros de pages (1-based) à scanner. None = toutes les pages.
+            
+        Returns:
+            Dictionnaire {numéro de page: zones détectées sur la page}
+        """
+        pages = set(pages) if pages is not None else None
+        resultats = {}
+        for page_num, page in enumerate(self.pdf.pages, start=1):
+            if pages is None or page_num in pages:
+                resultats[page_num] = self.extraire_zones_page(page, page_num)
+        return resultats
+    
+    @staticmethod
+    def dedoublonner(zones_par_page: Dict[int, List[ZoneDangereuse]]) -> List[ZoneDangereuse]:
+        """Fusionne les zones de chaque page dans l'ordre du document, un ID = une zone"""
+        zones = [zone for page_num in sorted(zones_par_page) for zone in zones_par_page[page_num]]
         unique_zones = {z.id_zone: z for z in zones}.values()
         return list(unique_zones)
+    
+    def extraire_zones_dangereuses(self) -> List[ZoneDangereuse]:
+        """Extraction ultra-tolérante par scan de texte brut."""
+        logger.info("Scan global du texte par page...")
+        return self.dedoublonner(self.extraire_zones_par_page())
 
 # ============================================================================
 # ÉTAPE 2 : IDENTIFICATION ET TRAITEMENT DES PLANS
 # ============================================================================
 
+class IndexSpatialPage:
+    """
+    Index spatial en grille uniforme des mots et des tracés d'une page de plan.
+    
+    Chaque élément est rangé dans toutes les cellules que couvre sa bbox, ce qui
+    permet des requêtes de région et de plus proche voisin sans parcourir la page.
+    """
+    
+    # Mots considérés comme des identifiants de prélèvement, pas des libellés
+    PATTERN_ID = re.compile(r'^[A-Z]{1,2}[-_]?\d{1,4}$')
+    PATTERN_LIBELLE = re.compile(r'^[A-Za-zÀ-ÿ][A-Za-zÀ-ÿ\'\-]{2,}$')
+    MOTS_LEGENDE = ("légende", "legende", "légendes", "legendes")
+    # Mots de cartouche, titre ou légende : jamais des noms de pièces
+    MOTS_HORS_PIECE = {
+        "plan", "plans", "niveau", "niveaux", "étage", "etage", "échelle", "echelle",
+        "cartouche", "indice", "date", "projet", "dessiné", "dessine", "vue", "coupe",
+        "façade", "facade", "nord", "sud", "est", "ouest", "repérage", "reperage",
+        "diagnostic", "amiante", "zone", "zones", "prélèvement", "prelevement",
+        "prélèvements", "prelevements", "sondage", "sondages", "bâtiment", "batiment",
+    }
+    
+    def __init__(self, taille_cellule: float = 50.0):
+        self.taille_cellule = taille_cellule
+        self.mots: List[Tuple[Tuple[float, float, float, float], str]] = []
+        self.traces: List[Tuple[float, float, float, float]] = []
+        self.avec_traces = True
+        self._grille_mots: Dict[Tuple[int, int], List[int]] = {}
+        self._grille_traces: Dict[Tuple[int, int], List[int]] = {}
+    
+    @classmethod
+    def depuis_page(cls, page, taille_cellule: float = 50.0, avec_traces: bool = True) -> "IndexSpatialPage":
+        """
+        Construit l'index à partir d'une page PyMuPDF (mots + tracés vectoriels).
+        Sans tracés, le bonus "dans le dessin" de score_occurrence est perdu.
+        """
+        index = cls(taille_cellule)
+        index.avec_traces = avec_traces
+        for x0, y0, x1, y1, mot, *_ in page.get_text("words"):
+            index.ajouter_mot((x0, y0, x1, y1), mot)
+        if not avec_traces:
+            return index
+        try:
+            for trace in page.get_drawings():
+                r = trace["rect"]
+                index.ajouter_trace((r.x0, r.y0, r.x1, r.y1))
+        except Exception as e:
+            logger.warning(f"Tracés non indexés page {page.number + 1}: {e}")
+        return index
+    
+    def _cellules(self, bbox: Tuple[float, float, float, float]):
+        t = self.taille_cellule
+        x0, y0, x1, y1 = bbox
+        for cx in range(int(x0 // t), int(x1 // t) + 1):
+            for cy in range(int(y0 // t), int(y1 // t) + 1):
+                yield cx, cy
+    
+    def ajouter_mot(self, bbox: Tuple[float, float, float, float], mot: str):
+        self.mots.append((tuple(bbox), mot))
+        for cellule in self._cellules(bbox):
+            self._grille_mots.setdefault(cellule, []).append(len(self.mots) - 1)
+    
+    def ajouter_trace(self, bbox: Tuple[float, float, float, float]):
+        self.traces.append(tuple(bbox))
+        for cellule in self._cellules(bbox):
+            self._grille_traces.setdefault(cellule, []).append(len(self.traces) - 1)
+    
+    @staticmethod
+    def _intersecte(a, b) -> bool:
+        return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+    
+    @staticmethod
+    def _distance(x: float, y: float, bbox) -> float:
+        """Distance euclidienne d'un point à une bbox (0 si le point est dedans)"""
+        dx = max(bbox[0] - x, 0.0, x - bbox[2])
+        dy = max(bbox[1] - y, 0.0, y - bbox[3])
+        return (dx * dx + dy * dy) ** 0.5
+    
+    def mots_dans_region(self, bbox) -> List[Tuple[Tuple[float, float, float, float], str]]:
+        """Mots dont la bbox intersecte la région"""
+        vus = set()
+        resultats = []
+        for cellule in self._cellules(bbox):
+            for i in self._grille_mots.get(cellule, ()):
+                if i not in vus and self._intersecte(self.mots[i][0], bbox):
+                    vus.add(i)
+                    resultats.append(self.mots[i])
+        return resultats
+    
+    def traces_contenant(self, x: float, y: float) -> int:
+        """Nombre de tracés dont la bbox contient le point"""
+        return sum(
+            1 for i in self._grille_traces.get(
+                (int(x // self.taille_cellule), int(y // self.taille_cellule)), ()
+            )
+            if self._distance(x, y, self.traces[i]) == 0.0
+        )
+    
+    def mot_le_plus_proche(self, x: float, y: float, filtre=None,
+                           rayon_max: float = 300.0) -> Optional[Tuple[Tuple[float, float, float, float], str]]:
+        """
+        Plus proche voisin par parcours d'anneaux de cellules croissants.
+        
+        Args:
+            x, y: Point de référence (coordonnées PDF)
+            filtre: Prédicat optionnel sur le texte du mot
+            rayon_max: Distance maximale de recherche en points
+        """
+        t = self.taille_cellule
+        cx0, cy0 = int(x // t), int(y // t)
+        meilleur, meilleure_dist = None, rayon_max
+        anneau = 0
+        # Un mot dans l'anneau n est au moins à (n - 1) * t du point
+        while (anneau - 1) * t <= meilleure_dist:
+            for cx in range(cx0 - anneau, cx0 + anneau + 1):
+                for cy in range(cy0 - anneau, cy0 + anneau + 1):
+                    if max(abs(cx - cx0), abs(cy - cy0)) != anneau:
+                        continue
+                    for i in self._grille_mots.get((cx, cy), ()):
+                        bbox, mot = self.mots[i]
+                        if filtre and not filtre(mot):
+                            continue
+                        dist = self._distance(x, y, bbox)
+                        if dist <= meilleure_dist:
+                            meilleur, meilleure_dist = self.mots[i], dist
+            anneau += 1
+        return meilleur
+    
+    def score_occurrence(self, bbox, rayon: float = 60.0) -> float:
+        """
+        Score d'une occurrence d'ID : élevé sur le dessin, faible dans une légende.
+        
+        Heuristiques:
+        - Pénalité si d'autres IDs sont regroupés autour (liste de légende)
+        - Forte pénalité si le mot "légende" est à proximité
+        - Bonus si l'occurrence est à l'intérieur de tracés vectoriels
+        """
+        cx, cy = (bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2
+        region = (cx - rayon, cy - rayon, cx + rayon, cy + rayon)
+        voisins = [
+            mot for b, mot in self.mots_dans_region(region)
+            if not self._intersecte(b, bbox)
+        ]
+        ids_voisins = sum(1 for mot in voisins if self.PATTERN_ID.match(mot.strip(":,;")))
+        legende = self.pres_legende(bbox, rayon)
+        return min(self.traces_contenant(cx, cy), 3) - ids_voisins - (10 if legende else 0)
+    
+    def pres_legende(self, bbox, rayon: float = 60.0) -> bool:
+        """Occurrence voisine du mot "légende" (liste d'IDs, pas leur position sur le dessin)"""
+        cx, cy = (bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2
+        region = (cx - rayon, cy - rayon, cx + rayon, cy + rayon)
+        return any(
+            mot.lower().strip(":") in self.MOTS_LEGENDE
+            for b, mot in self.mots_dans_region(region)
+            if not self._intersecte(b, bbox)
+        )
+    
+    def piece_la_plus_proche(self, bbox) -> Optional[str]:
+        """Libellé textuel (hors IDs) le plus proche d'une occurrence"""
+        cx, cy = (bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2
+        
+        def est_libelle(mot: str) -> bool:
+            mot = mot.strip(":,;.")
+            return (bool(self.PATTERN_LIBELLE.match(mot))
+                    and not self.PATTERN_ID.match(mot)
+                    and mot.lower() not in self.MOTS_LEGENDE
+                    and mot.lower() not in self.MOTS_HORS_PIECE)
+        
+        trouve = self.mot_le_plus_proche(cx, cy, filtre=est_libelle)
+        return trouve[1].strip(":,;.") if trouve else None
+
+
 class PlanDetector:
     """
     Responsable de l'identification des pages de plans et de la localisation
     des zones sur ces plans via recherche textuelle + coordonnées.
     """
     
-    def __init__(self, pdf_path: str):
-        self.pdf_path = pdf_path
+    def __init__(self, pdf_path: SourcePDF, empreintes: Optional[List[str]] = None,
+                 precedent: Optional[Dict[str, Dict]] = None,
+                 budget: Optional[BudgetTemps] = None):
+        """
+        Args:
+            pdf_path: Chemin du rapport ou contenu PDF en mémoire
+            empreintes: Empreinte de chaque page (index 0-based), pour le mode incrémental
+            precedent: Résultats par empreinte d'une révision précédente
+                ({empreinte: {"est_plan": bool, "recherches": {id: {...} | None}}})
+            budget: Budgets de temps (index spatial abandonné si épuisé)
+        """
+        self.pdf_path = charger_source_pdf(pdf_path)
         self.doc = None  # PyMuPDF document
+        self._index_pages: Dict[int, IndexSpatialPage] = {}  # Cache par numéro de page
+        self.empreintes = empreintes
+        self.precedent = precedent or {}
+        # Résultats de cette analyse, par empreinte (même format que precedent)
+        self.resultats_pages: Dict[str, Dict] = {}
+        self.budget = budget
+        self._sans_traces = False  # Tracés plus indexés après une page lente
         
     def __enter__(self):
-        self.doc = fitz.open(self.pdf_path)
+        self.doc = ouvrir_fitz(self.pdf_path)
         return self
         
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self.doc:
             self.doc.close()
     
+    # Jeton de plan susceptible d'être un ID de zone (ex. P12, LOCAL-04, Z_3)
+    TOKEN_ID = re.compile(r"^(?=.*\d)(?=.*[A-Z])[A-Z0-9_-]{2,16}$")
+    
     def est_page_plan(self, page) -> bool:
         """
         Détecte si une page est un plan architectural.
@@ -383,6 +961,88 @@ class PlanDetector:
         
         return est_plan
     
+    def index_page(self, page) -> Optional[IndexSpatialPage]:
+        """
+        Index spatial de la page, construit au premier accès puis mis en cache.
+        None si le budget est épuisé avant sa construction. get_drawings étant
+        coûteux sur les plans vectoriels lourds, les pages indexées après une
+        page lente le sont sans leurs tracés.
+        """
+        index = self._index_pages.get(page.number)
+        if index is None:
+            if self.budget and self.budget.epuise():
+                self.budget.degrader("link", "index spatial ignoré", page.number + 1)
+                return None
+            debut = time.monotonic()
+            index = IndexSpatialPage.depuis_page(page, avec_traces=not self._sans_traces)
+            duree = time.monotonic() - debut
+            if not self._sans_traces and self.budget and self.budget.depasse_page(duree):
+                self._sans_traces = True
+                self.budget.degrader("link", "index sans tracés",
+                                     detail=f"après la page lente {page.number + 1} (index {duree:.1f} s)")
+            self._index_pages[page.number] = index
+        return index
+    
+    def choisir_occurrence(self, page, occurrences: List) -> Tuple[float, float, float, float]:
+        """
+        Départage plusieurs occurrences d'un ID sur une même page.
+        Une seule occurrence est retournée telle quelle, sans construire l'index.
+        """
+        if len(occurrences) == 1:
+            return tuple(occurrences[0])
+        
+        index = self.index_page(page)
+        if index is None:
+            return tuple(occurrences[0])
+        # max() conserve la première occurrence en cas d'égalité
+        meilleure = max(occurrences, key=lambda r: index.score_occurrence(tuple(r)))
+        return tuple(meilleure)
+    
+    def resoudre_occurrence(self, page, bbox) -> Dict:
+        """
+        Occurrence retenue sur une page, qualifiée pour le choix entre pages :
+        {"bbox", "piece", "score", "legende"}. Sans index complet (budget),
+        l'occurrence est marquée "degrade" : elle n'est pas conservée par le store.
+        """
+        index = self.index_page(page)
+        if index is None:
+            return {"bbox": list(bbox), "piece": None, "score": 0, "legende": False, "degrade": True}
+        trouve = {
+            "bbox": list(bbox),
+            "piece": index.piece_la_plus_proche(bbox),
+            "score": index.score_occurrence(bbox),
+            "legende": index.pres_legende(bbox),
+        }
+        if not index.avec_traces:
+            trouve["degrade"] = True
+        return trouve
+    
+    @staticmethod
+    def choisir_page(trouvailles: Iterable[Tuple[int, Optional[Dict]]]) -> Optional[Tuple[int, Dict]]:
+        """
+        Choix du plan parmi les occurrences de chaque page, dans l'ordre du document.
+        
+        Les occurrences de légende sont écartées ; la première occurrence de score
+        positif ou nul (sur le dessin) l'emporte, sinon la première restante.
+        Les trouvailles sont consommées au fil de l'eau : la recherche s'arrête
+        à la première occurrence sur le dessin.
+        """
+        repli = None
+        for page_num, trouve in trouvailles:
+            if not trouve or trouve.get("legende"):
+                continue
+            if trouve.get("score", 0) >= 0:
+                return page_num, trouve
+            if repli is None:
+                repli = (page_num, trouve)
+        return repli
+    
+    @staticmethod
+    def _appliquer(zone: ZoneDangereuse, page_num: int, trouve: Dict):
+        zone.plan_page = page_num  # Indexation humaine
+        zone.plan_bbox = tuple(trouve["bbox"])
+        zone.plan_piece = trouve["piece"]
+    
     def chercher_zone_sur_plan(self, page, zone_id: str) -> Optional[Tuple[float, float, float, float]]:
         """
         Recherche l'ID d'une zone sur un plan et retourne ses coordonnées.
@@ -398,27 +1058,148 @@ class PlanDetector:
         text_instances = page.search_for(zone_id)
         
         if text_instances:
-            # Prendre la première occurrence
-            bbox = text_instances[0]
+            # Plusieurs occurrences possibles (légende + dessin) : départage spatial
+            bbox = self.choisir_occurrence(page, text_instances)
             logger.info(f"  ✓ '{zone_id}' trouvé sur page {page.number + 1} à {bbox}")
-            return tuple(bbox)
+            return bbox
         
         # Tentative avec variations (minuscules, avec tiret, etc.)
-        variations = [
+        for variant in self.variantes_id(zone_id):
+            text_instances = page.search_for(variant)
+            if text_instances:
+                bbox = self.choisir_occurrence(page, text_instances)
+                logger.info(f"  ✓ '{zone_id}' (variante: {variant}) trouvé sur page {page.number + 1}")
+                return bbox
+        
+        return None
+    
+    @staticmethod
+    def variantes_id(zone_id: str) -> List[str]:
+        """Variantes essayées quand l'ID exact est absent du plan"""
+        return [
             zone_id.lower(),
             zone_id.replace("-", ""),
             zone_id.replace("_", ""),
             zone_id.replace(" ", "")
         ]
+    
+    def indexer_identifiants(self, page) -> Dict[str, Dict]:
+        """
+        Index des jetons ressemblant à un ID sur une page de plan, chacun résolu
+        comme par chercher_zone_sur_plan : {jeton: {"bbox", "piece", "score", "legende"}}.
         
-        for variant in variations:
-            text_instances = page.search_for(variant)
-            if text_instances:
-                bbox = text_instances[0]
-                logger.info(f"  ✓ '{zone_id}' (variante: {variant}) trouvé sur page {page.number + 1}")
-                return tuple(bbox)
+        Permet de lier aux plans d'un shard des zones extraites par un autre.
+        Les IDs en deux mots ("P 12") et les IDs accolés par un séparateur
+        ("P12/P13", "Z-12+Z-13") sont indexés ; un ID qui n'apparaît qu'à
+        l'intérieur d'un mot plus long (P12 dans P123) ne l'est pas.
+        """
+        nettoyer = lambda mot: mot.strip("()[]{}.,;:").upper()
+        mots = page.get_text("words")  # (x0, y0, x1, y1, mot, bloc, ligne, n°)
+        jetons = []
+        for i, mot in enumerate(mots):
+            texte = nettoyer(mot[4])
+            # Mot entier, puis ses parties (séparateurs hors ID, puis tirets et soulignés)
+            for partie in [texte] + re.split(r"[^A-Z0-9_-]+", texte) + re.split(r"[^A-Z0-9]+", texte):
+                if self.TOKEN_ID.match(partie):
+                    jetons.append(partie)
+            suivant = mots[i + 1] if i + 1 < len(mots) else None
+            if (suivant and suivant[5:7] == mot[5:7] and re.fullmatch(r"[A-Z]{1,2}", texte)
+                    and re.fullmatch(r"\d{1,4}", nettoyer(suivant[4]))):
+                jetons.append(f"{texte} {nettoyer(suivant[4])}")
+        
+        index_jetons = {}
+        for jeton in dict.fromkeys(jetons):
+            occurrences = page.search_for(jeton)
+            if not occurrences:
+                continue
+            bbox = self.choisir_occurrence(page, occurrences)
+            index_jetons[jeton] = self.resoudre_occurrence(page, bbox)
+        return index_jetons
+    
+    @classmethod
+    def lier_zone_par_index(cls, zone: ZoneDangereuse, index_plans: Dict[int, Dict[str, Dict]]) -> bool:
+        """
+        Équivalent de lier_zone à partir des index de jetons des pages de plans
+        (numéros 1-based) : même ordre de pages, ID exact avant variantes, même
+        choix entre pages.
+        """
+        def trouvailles():
+            for page_num in sorted(index_plans):
+                jetons = index_plans[page_num]
+                trouve = next((jetons[v.upper()] for v in [zone.id_zone] + cls.variantes_id(zone.id_zone)
+                               if v.upper() in jetons), None)
+                yield page_num, trouve
+        
+        choix = cls.choisir_page(trouvailles())
+        if choix:
+            cls._appliquer(zone, *choix)
+        return choix is not None
+    
+    def _resultat_page(self, page_num: int) -> Optional[Dict]:
+        """Entrée de resultats_pages de la page (0-based), reprise de la révision précédente si connue"""
+        if self.empreintes is None:
+            return None
+        empreinte = self.empreintes[page_num]
+        if empreinte not in self.resultats_pages:
+            anterieur = self.precedent.get(empreinte, {})
+            self.resultats_pages[empreinte] = {
+                "est_plan": anterieur.get("est_plan"),
+                "recherches": dict(anterieur.get("recherches", {})),
+            }
+        return self.resultats_pages[empreinte]
+    
+    def identifier_pages_plans(self, pages: Optional[Iterable[int]] = None) -> List[int]:
+        """
+        Numéros (0-based) des pages identifiées comme plans.
         
-        return None
+        Args:
+            pages: Pages (0-based) à classer. None = tout le document.
+        """
+        pages_plans = []
+        for page_num in (range(len(self.doc)) if pages is None else pages):
+            resultat = self._resultat_page(page_num)
+            if resultat is not None and resultat["est_plan"] is not None:
+                est_plan = resultat["est_plan"]
+            else:
+                est_plan = self.est_page_plan(self.doc[page_num])
+                if resultat is not None:
+                    resultat["est_plan"] = est_plan
+            if est_plan:
+                pages_plans.append(page_num)
+        
+        logger.info(f"✓ {len(pages_plans)} pages de plans identifiées: {pages_plans}")
+        return pages_plans
+    
+    def lier_zone(self, zone: ZoneDangereuse, pages_plans: List[int]) -> bool:
+        """
+        Associe la zone au premier plan où son ID figure sur le dessin
+        (occurrences de légende écartées, voir choisir_page).
+        
+        Returns:
+            True si la zone a été liée à un plan
+        """
+        logger.info(f"Recherche de '{zone.id_zone}' sur les plans...")
+        
+        def trouvailles():
+            for page_num in pages_plans:
+                resultat = self._resultat_page(page_num)
+                if resultat is not None and zone.id_zone in resultat["recherches"]:
+                    trouve = resultat["recherches"][zone.id_zone]
+                else:
+                    page = self.doc[page_num]
+                    bbox = self.chercher_zone_sur_plan(page, zone.id_zone)
+                    trouve = self.resoudre_occurrence(page, bbox) if bbox else None
+                    if resultat is not None and not (trouve and trouve.get("degrade")):
+                        resultat["recherches"][zone.id_zone] = trouve
+                yield page_num + 1, trouve
+        
+        choix = self.choisir_page(trouvailles())
+        if choix:
+            self._appliquer(zone, *choix)
+            return True
+        
+        logger.warning(f"  ✗ '{zone.id_zone}' non trouvé sur les plans (hors légendes)")
+        return False
     
     def lier_zones_aux_plans(self, zones: List[ZoneDangereuse]) -> List[ZoneDangereuse]:
         """
@@ -428,57 +1209,62 @@ class PlanDetector:
         1. Identifier toutes les pages de plans
         2. Pour chaque zone, scanner tous les plans
         3. Associer la zone au premier plan où l'ID est trouvé
+        
+        En mode incrémental, la classification et les recherches d'une page dont
+        l'empreinte est connue sont reprises sans relire la page.
         """
         logger.info("Démarrage liaison zones ↔ plans...")
         
         # Étape 1: Identifier les pages de plans
-        pages_plans = []
-        for page_num in range(len(self.doc)):
-            page = self.doc[page_num]
-            if self.est_page_plan(page):
-                pages_plans.append(page_num)
-        
-        logger.info(f"✓ {len(pages_plans)} pages de plans identifiées: {pages_plans}")
+        pages_plans = self.identifier_pages_plans()
         
         # Étape 2: Pour chaque zone, chercher sur les plans
-        zones_liees = 0
-        for zone in zones:
-            logger.info(f"Recherche de '{zone.id_zone}' sur les plans...")
-            
-            for page_num in pages_plans:
-                page = self.doc[page_num]
-                bbox = self.chercher_zone_sur_plan(page, zone.id_zone)
-                
-                if bbox:
-                    zone.plan_page = page_num + 1  # Indexation humaine
-                    zone.plan_bbox = bbox
-                    zones_liees += 1
-                    break  # Prendre le premier plan trouvé
-            
-            if not zone.plan_bbox:
-                logger.warning(f"  ✗ '{zone.id_zone}' non trouvé sur les plans")
+        zones_liees = sum(1 for zone in zones if self.lier_zone(zone, pages_plans))
         
         logger.info(f"✓ Liaison terminée: {zones_liees}/{len(zones)} zones liées à un plan")
         return zones
 
 
-# ============================================================================
-# ÉTAPE 3 : GÉNÉRATION DES ASSETS VISUELS
-# ============================================================================
+def _police_label(taille: int = 24):
+    """Police des labels rouges dessinés sur les plans"""
+    from PIL import ImageFont
+    
+    try:
+        return ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", taille)
+    except:
+        return ImageFont.load_default()
+
 
 class ImageCropper:
     """
     Responsable de la génération des crops de plans avec mise en évidence.
     """
     
-    def __init__(self, pdf_path: str, output_dir: str = "/home/claude/crops"):
-        self.pdf_path = pdf_path
-        self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(exist_ok=True)
+    # Résolution de repli quand le budget de temps est serré
+    DPI_DEGRADE = 72
+    
+    def __init__(self, pdf_path: SourcePDF, output_dir: Optional[str] = "/home/claude/crops",
+                 budget: Optional[BudgetTemps] = None):
+        """
+        Args:
+            pdf_path: Chemin du rapport ou contenu PDF en mémoire
+            output_dir: Dossier des PNG ; None = crops conservés en mémoire (self.crops)
+            budget: Budgets de temps (DPI réduit puis crops ignorés si dépassés)
+        """
+        self.pdf_path = charger_source_pdf(pdf_path)
+        self.output_dir = Path(output_dir) if output_dir else None
+        if self.output_dir:
+            self.output_dir.mkdir(exist_ok=True)
+        self.crops: Dict[str, bytes] = {}  # PNG par id_zone (mode mémoire)
         self.doc = None
+        self.budget = budget
+        # Display list de la dernière page rendue : le contenu n'est interprété
+        # qu'une fois pour tous les crops d'une même page
+        self._display_list = (None, None)
+        self._pages_lentes: Dict[int, float] = {}  # Durée de la display list par page lente
         
     def __enter__(self):
-        self.doc = fitz.open(self.pdf_path)
+        self.doc = ouvrir_fitz(self.pdf_path)
         return self
         
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -495,114 +1281,639 @@ class ImageCropper:
             dpi: Résolution de rendu
             
         Returns:
-            Chemin du fichier image généré, ou None si échec
+            Chemin du fichier image généré (id de la zone en mode mémoire), ou None si échec
+        """
+        return self.generer_crop_groupe([zone], crop_size, dpi)
+    
+    def generer_crop_groupe(self, zones: List[ZoneDangereuse], crop_size: int = 800,
+                            dpi: int = 200) -> Optional[str]:
+        """
+        Génère un crop partagé par des zones voisines d'un même plan (voir
+        regrouper_zones), centré sur l'ensemble, avec le cadre et le label de
+        chaque zone. Chaque zone du groupe référence le même crop.
+        
+        Returns:
+            Chemin du fichier image généré (id de la première zone en mode
+            mémoire), ou None si échec
         """
+        import fitz
+        from PIL import Image, ImageDraw
+
+        zone = zones[0]
         if not zone.plan_page or not zone.plan_bbox:
             logger.warning(f"Zone {zone.id_zone}: pas de plan associé")
             return None
         
+        if self.budget and self.budget.epuise():
+            self.budget.degrader("crop", "crops ignorés")
+            return None
+        
         page_num = zone.plan_page - 1  # Indexation 0-based
         page = self.doc[page_num]
+        display_list = self._display_list_page(page)
+        
+        # Résolution effective : réduite si la page est lente ou le budget serré.
+        # La zone couverte reste celle calculée avec la résolution nominale.
+        dpi_rendu = dpi
+        if page_num in self._pages_lentes:
+            dpi_rendu = min(dpi, self.DPI_DEGRADE)
+            self.budget.degrader("crop", f"DPI réduit à {dpi_rendu}", zone.plan_page,
+                                 f"page lente ({self._pages_lentes[page_num]:.1f} s)")
+        elif self.budget and self.budget.fraction_consommee() >= 0.8:
+            dpi_rendu = min(dpi, self.DPI_DEGRADE)
+            self.budget.degrader("crop", f"DPI réduit à {dpi_rendu}")
+        if dpi_rendu < dpi:
+            for zone_groupe in zones:
+                self.budget.marquer_degrade("crop", zone_groupe.id_zone)
+        echelle = dpi_rendu / 72
         
-        # Coordonnées du texte trouvé
-        x0, y0, x1, y1 = zone.plan_bbox
-        center_x = (x0 + x1) / 2
-        center_y = (y0 + y1) / 2
-        
-        # Calculer la zone de crop (carré centré)
         # Note: Les coordonnées PDF sont en points (1/72 inch)
         # Conversion en pixels selon DPI
-        mat = fitz.Matrix(dpi / 72, dpi / 72)
+        mat = fitz.Matrix(echelle, echelle)
         
-        # Définir rectangle de crop (en coordonnées PDF)
-        half_size = crop_size / 2 * (72 / dpi)  # Convertir pixels → points
-        crop_rect = fitz.Rect(
-            center_x - half_size,
-            center_y - half_size,
-            center_x + half_size,
-            center_y + half_size
-        )
-        
-        # S'assurer que le crop reste dans les limites de la page
-        page_rect = page.rect
-        crop_rect = crop_rect & page_rect  # Intersection
+        # Zone de crop (carré centré sur l'ensemble des zones, en coordonnées PDF)
+        emprise = fitz.Rect(zone.plan_bbox)
+        for autre in zones[1:]:
+            emprise |= fitz.Rect(autre.plan_bbox)
+        crop_rect = self.rect_crop(tuple(emprise), page.rect, crop_size, dpi)
         
         # Render la zone
-        pix = page.get_pixmap(matrix=mat, clip=crop_rect)
+        pix = display_list.get_pixmap(matrix=mat, clip=crop_rect)
         
         # Convertir en PIL Image pour annotations
         img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
         
-        # Ajouter annotations (cadre rouge autour de la zone)
+        # Ajouter annotations (cadre rouge autour de chaque zone)
         draw = ImageDraw.Draw(img)
-        
-        # Calculer position du texte dans le crop
-        # Transformation: coordonnées PDF → coordonnées crop image
-        text_x0 = (x0 - crop_rect.x0) * (dpi / 72)
-        text_y0 = (y0 - crop_rect.y0) * (dpi / 72)
-        text_x1 = (x1 - crop_rect.x0) * (dpi / 72)
-        text_y1 = (y1 - crop_rect.y0) * (dpi / 72)
-        
-        # Cadre rouge autour du texte (élargi)
-        padding = 10
-        draw.rectangle(
-            [text_x0 - padding, text_y0 - padding, text_x1 + padding, text_y1 + padding],
-            outline="red",
-            width=5
-        )
-        
-        # Ajouter un label
-        try:
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 24)
-        except:
-            font = ImageFont.load_default()
-        
-        label = f"ZONE {zone.id_zone}"
-        # Positionner le label au-dessus du cadre
-        draw.text((text_x0, text_y0 - 30), label, fill="red", font=font)
+        ratio = dpi_rendu / dpi
+        padding = 10 * ratio
+        police = _police_label(max(10, round(24 * ratio)))
+        
+        cadres = []
+        for zone_groupe in zones:
+            # Calculer position du texte dans le crop
+            # Transformation: coordonnées PDF → coordonnées crop image
+            x0, y0, x1, y1 = zone_groupe.plan_bbox
+            text_x0 = (x0 - crop_rect.x0) * echelle
+            text_y0 = (y0 - crop_rect.y0) * echelle
+            text_x1 = (x1 - crop_rect.x0) * echelle
+            text_y1 = (y1 - crop_rect.y0) * echelle
+            
+            # Cadre rouge autour du texte (élargi), proportionnel à la résolution effective
+            cadre = (text_x0 - padding, text_y0 - padding, text_x1 + padding, text_y1 + padding)
+            draw.rectangle(cadre, outline="red", width=max(2, round(5 * ratio)))
+            cadres.append((zone_groupe, cadre))
+        
+        # Labels posés une fois tous les cadres connus : chacun contre son cadre,
+        # sans chevaucher les labels déjà posés ni les cadres des autres zones
+        labels = []
+        for zone_groupe, cadre in cadres:
+            label = f"ZONE {zone_groupe.id_zone}"
+            obstacles = labels + [autre for membre, autre in cadres if membre is not zone_groupe]
+            position = self._placer_label(draw, label, police, cadre, obstacles, img.size, max(2, 4 * ratio))
+            draw.text(position, label, fill="red", font=police)
+            labels.append(draw.textbbox(position, label, font=police))
+        
+        ids = "_".join(zone_groupe.id_zone for zone_groupe in zones)
         
         # Sauvegarder
-        output_path = self.output_dir / f"crop_{zone.id_zone}.png"
+        if self.output_dir is None:
+            buffer = io.BytesIO()
+            img.save(buffer, "PNG")
+            crop = buffer.getvalue()
+            for zone_groupe in zones:
+                self.crops[zone_groupe.id_zone] = crop
+            logger.info(f"✓ Crop généré en mémoire: {ids}")
+            return zone.id_zone
+        
+        output_path = self.output_dir / f"crop_{ids}.png"
         img.save(output_path, "PNG")
         logger.info(f"✓ Crop généré: {output_path}")
         
-        zone.plan_crop_path = str(output_path)
+        for zone_groupe in zones:
+            zone_groupe.plan_crop_path = str(output_path)
         return str(output_path)
     
+    @staticmethod
+    def _placer_label(draw, label: str, police, cadre, obstacles, taille_image, ecart: float) -> Tuple[float, float]:
+        """
+        Position du label d'un cadre : au-dessus, puis en dessous (aligné à
+        gauche puis à droite du cadre), puis empilé au-dessus ; la première
+        qui reste dans l'image sans chevaucher d'obstacle. Au-dessus du cadre
+        à défaut.
+        """
+        gauche, haut, droite, bas = draw.textbbox((0, 0), label, font=police)
+        largeur_img, hauteur_img = taille_image
+        x0, y0, x1, y1 = cadre
+        y_dessus = y0 - ecart - bas
+        y_dessous = y1 + ecart - haut
+        
+        def libre(rect):
+            if rect[0] < 0 or rect[1] < 0 or rect[2] > largeur_img or rect[3] > hauteur_img:
+                return False
+            # Écart conservé autour des obstacles, pour que deux labels restent lisibles
+            return not any(rect[0] < o[2] + ecart and o[0] - ecart < rect[2]
+                           and rect[1] < o[3] + ecart and o[1] - ecart < rect[3]
+                           for o in obstacles)
+        
+        candidats = [(x, y) for y in (y_dessus, y_dessous) for x in (x0, x1 - droite)]
+        candidats += [(x0, y_dessus - k * (bas - haut + ecart)) for k in range(1, len(obstacles) + 1)]
+        for x, y in candidats:
+            x = min(max(x, -gauche), largeur_img - droite)
+            if libre((x + gauche, y + haut, x + droite, y + bas)):
+                return x, y
+        return min(max(x0, -gauche), largeur_img - droite), y_dessus
+    
+    @staticmethod
+    def regrouper_zones(zones: List[ZoneDangereuse], crop_size: int = 800,
+                        dpi: int = 200) -> List[List[ZoneDangereuse]]:
+        """
+        Regroupe les zones d'un même plan dont les cadres et labels tiennent
+        ensemble dans une fenêtre de crop (regroupement glouton, dans l'ordre
+        de lecture). Les zones sans plan sont ignorées.
+        """
+        import fitz
+        
+        fenetre = crop_size * 72 / dpi  # Côté du crop en points
+        marge = 40 * 72 / dpi  # Cadre et label, au-dessus ou en dessous (40 px à dpi)
+        police = _police_label(24)
+        groupes: List[List] = []  # [page, emprise cumulée, zones]
+        
+        zones_liees = [zone for zone in zones if zone.plan_page and zone.plan_bbox]
+        for zone in sorted(zones_liees, key=lambda z: (z.plan_page, z.plan_bbox[1], z.plan_bbox[0])):
+            # Largeur du label réservée : il peut déborder d'un cadre étroit
+            largeur_label = police.getlength(f"ZONE {zone.id_zone}") * 72 / dpi
+            x0, y0, x1, y1 = zone.plan_bbox
+            emprise = fitz.Rect(x0 - marge, y0 - marge, max(x1, x0 + largeur_label) + marge, y1 + marge)
+            for groupe in groupes:
+                if groupe[0] != zone.plan_page:
+                    continue
+                union = groupe[1] | emprise
+                if union.width <= fenetre and union.height <= fenetre:
+                    groupe[1] = union
+                    groupe[2].append(zone)
+                    break
+            else:
+                groupes.append([zone.plan_page, emprise, [zone]])
+        
+        return [membres for _, _, membres in groupes]
+    
+    @staticmethod
+    def rect_crop(bbox: Tuple[float, float, float, float], page_rect,
+                  crop_size: int = 800, dpi: int = 200):
+        """
+        Rectangle PDF (fitz.Rect) d'un crop carré de crop_size pixels à dpi,
+        centré sur la bbox et limité à la page.
+        """
+        import fitz
+        
+        x0, y0, x1, y1 = bbox
+        center_x = (x0 + x1) / 2
+        center_y = (y0 + y1) / 2
+        half_size = crop_size / 2 * (72 / dpi)  # Convertir pixels → points
+        crop_rect = fitz.Rect(
+            center_x - half_size,
+            center_y - half_size,
+            center_x + half_size,
+            center_y + half_size
+        )
+        # S'assurer que le crop reste dans les limites de la page
+        return crop_rect & page_rect  # Intersection
+    
+    def _display_list_page(self, page):
+        """Display list de la page (cache d'une page), chronométrée pour le budget par page"""
+        numero, display_list = self._display_list
+        if numero != page.number:
+            debut = time.monotonic()
+            display_list = page.get_displaylist()
+            duree = time.monotonic() - debut
+            if self.budget and self.budget.depasse_page(duree):
+                self._pages_lentes[page.number] = duree
+            self._display_list = (page.number, display_list)
+        return display_list
+    
     def generer_tous_les_crops(self, zones: List[ZoneDangereuse]) -> int:
         """
-        Génère les crops pour toutes les zones.
+        Génère les crops pour toutes les zones, un crop partagé par groupe de
+        zones voisines sur un même plan.
         
         Returns:
-            Nombre de crops générés avec succès
+            Nombre de zones dotées d'un crop
         """
         logger.info("Démarrage génération des crops...")
         count = 0
         
+        groupes = self.regrouper_zones(zones)
+        for groupe in groupes:
+            if self.generer_crop_groupe(groupe):
+                count += len(groupe)
+        
         for zone in zones:
-            if self.generer_crop(zone):
-                count += 1
+            if not zone.plan_page or not zone.plan_bbox:
+                logger.warning(f"Zone {zone.id_zone}: pas de plan associé")
         
-        logger.info(f"✓ {count}/{len(zones)} crops générés")
+        logger.info(f"✓ {count}/{len(zones)} zones avec crop ({len(groupes)} rendus)")
         return count
 
 
+class CropsParesseux(Mapping):
+    """
+    Crops générés à la demande : {id_zone: PNG} en lecture seule.
+    
+    Un crop n'est rendu qu'au premier accès (affichage d'une zone, export de la
+    fiche) puis mémorisé, pour toutes les zones de son groupe (crop partagé).
+    L'appartenance (id in crops) ne déclenche aucun rendu.
+    Le document PyMuPDF reste ouvert entre deux accès ; appeler fermer() pour le
+    libérer.
+    
+    Le budget document de l'analyse ne s'applique qu'aux rendus faits pendant
+    analyser() (fiche) : après terminer_analyse(), chaque rendu reçoit son
+    propre budget, limité au seul budget par page (DPI réduit sur une page
+    lente), pour qu'un crop affiché des minutes plus tard ne soit pas ignoré
+    parce que l'horloge de l'analyse a expiré.
+    """
+    
+    def __init__(self, pdf_path: SourcePDF, zones: List[ZoneDangereuse],
+                 output_dir: Optional[str] = None, budget: Optional[BudgetTemps] = None):
+        """
+        Args:
+            pdf_path: Chemin du rapport ou contenu PDF en mémoire
+            zones: Zones (seules celles liées à un plan ont un crop)
+            output_dir: Dossier des PNG ; None = crops conservés en mémoire
+            budget: Budgets de temps de l'analyse, transmis à ImageCropper
+        """
+        import threading
+        
+        self.pdf_path = charger_source_pdf(pdf_path)
+        self.output_dir = output_dir
+        self.budget = budget
+        self._zones = {zone.id_zone: zone for zone in zones if zone.plan_page and zone.plan_bbox}
+        self._groupes = {
+            zone.id_zone: groupe
+            for groupe in ImageCropper.regrouper_zones(list(self._zones.values()))
+            for zone in groupe
+        }
+        self._memo: Dict[str, Optional[bytes]] = {}
+        self._cropper: Optional[ImageCropper] = None
+        self._analyse_terminee = False
+        self._verrou = threading.Lock()  # Streamlit peut servir une session depuis plusieurs threads
+    
+    def __getitem__(self, id_zone: str) -> bytes:
+        if id_zone not in self._zones:
+            raise KeyError(id_zone)
+        with self._verrou:
+            if id_zone not in self._memo:
+                groupe = self._groupes[id_zone]
+                crop = self._generer(groupe)
+                for zone in groupe:
+                    self._memo[zone.id_zone] = crop
+        crop = self._memo[id_zone]
+        if crop is None:
+            raise KeyError(id_zone)
+        return crop
+    
+    def __contains__(self, id_zone) -> bool:
+        return id_zone in self._zones and self._memo.get(id_zone, b"") is not None
+    
+    def __iter__(self):
+        return iter(self._zones)
+    
+    def __len__(self) -> int:
+        return len(self._zones)
+    
+    @property
+    def generes(self) -> int:
+        """Nombre de crops effectivement rendus"""
+        return sum(1 for crop in self._memo.values() if crop is not None)
+    
+    def terminer_analyse(self):
+        """
+        Fin d'analyser() : les rendus suivants ont chacun leur propre budget, et
+        les crops ignorés faute de budget pendant l'analyse seront retentés.
+        """
+        with self._verrou:
+            self._analyse_terminee = True
+            self._memo = {id_zone: crop for id_zone, crop in self._memo.items() if crop is not None}
+    
+    def _budget_rendu(self) -> Optional[BudgetTemps]:
+        if self.budget is None or not self._analyse_terminee:
+            return self.budget
+        return BudgetTemps(page_s=self.budget.page_s)
+    
+    def _generer(self, groupe: List[ZoneDangereuse]) -> Optional[bytes]:
+        if self._cropper is None:
+            self._cropper = ImageCropper(self.pdf_path, self.output_dir, self.budget).__enter__()
+        self._cropper.budget = self._budget_rendu()
+        resultat = self._cropper.generer_crop_groupe(groupe)
+        if not resultat:
+            return None
+        if self.output_dir is None:
+            crop = self._cropper.crops[groupe[0].id_zone]
+            for zone in groupe:
+                del self._cropper.crops[zone.id_zone]
+            return crop
+        return Path(resultat).read_bytes()
+    
+    def fermer(self):
+        with self._verrou:
+            if self._cropper is not None:
+                self._cropper.__exit__(None, None, None)
+                self._cropper = None
+
+
+# Référence indirecte dans la source d'un objet PDF ("12 0 R")
+_REFERENCE_PDF = re.compile(r"\b(\d+)\s+(\d+)\s+R\b")
+
+
+def _empreinte_objet(doc, xref: int, memo: Dict[int, bytes]) -> bytes:
+    """
+    Empreinte d'un objet PDF et, récursivement, de tout ce qu'il référence
+    (flux bruts compris). Les références sont remplacées par l'empreinte de
+    l'objet visé : la renumérotation des xrefs ne change rien.
+    """
+    import hashlib
+
+    if xref in memo:
+        return memo[xref]
+    memo[xref] = b"cycle"  # Référence circulaire : marqueur stable
+    h = hashlib.sha256()
+    try:
+        source = doc.xref_object(xref, compressed=True)
+        h.update(_REFERENCE_PDF.sub(
+            lambda m: "<" + _empreinte_objet(doc, int(m.group(1)), memo).hex() + ">", source
+        ).encode())
+        if doc.xref_is_stream(xref):
+            h.update(doc.xref_stream_raw(xref) or b"")
+    except Exception:
+        h.update(f"xref {xref} illisible".encode())
+    memo[xref] = h.digest()
+    return memo[xref]
+
+
+def empreinte_page(page, memo: Optional[Dict[int, bytes]] = None) -> str:
+    """
+    Empreinte SHA-256 d'une page PyMuPDF : géométrie, flux de contenu et,
+    récursivement, ressources (héritées comprises) : polices, images, XObjects
+    de formulaire et leurs propres ressources.
+    Deux pages d'empreinte identique produisent le même rendu.
+    
+    Args:
+        memo: Empreintes des objets déjà hachés, à partager entre les pages
+            d'un même document (polices communes)
+    """
+    import hashlib
+
+    doc = page.parent
+    memo = {} if memo is None else memo
+    h = hashlib.sha256()
+    h.update(repr((tuple(page.rect), page.rotation)).encode())
+    h.update(page.read_contents())
+    
+    # Ressources de la page, sinon héritées de l'arbre des pages
+    xref = page.xref
+    type_ressources, ressources = doc.xref_get_key(xref, "Resources")
+    while type_ressources == "null":
+        type_parent, parent = doc.xref_get_key(xref, "Parent")
+        if type_parent != "xref":
+            break
+        xref = int(parent.split()[0])
+        type_ressources, ressources = doc.xref_get_key(xref, "Resources")
+    h.update(_REFERENCE_PDF.sub(
+        lambda m: "<" + _empreinte_objet(doc, int(m.group(1)), memo).hex() + ">", ressources
+    ).encode())
+    return h.hexdigest()
+
+
+class PlanTileCache:
+    """
+    Cache disque de tuiles (pyramide multi-niveaux) des pages de plans.
+    
+    Chaque page est rastérisée une seule fois à la résolution maximale ; les
+    niveaux inférieurs sont obtenus par sous-échantillonnage. Les tuiles sont
+    rangées sous <cache_dir>/<empreinte>/<niveau>/<col>_<ligne>.png, de sorte
+    qu'une page inchangée n'est jamais re-rendue, même d'un rapport à l'autre.
+    Le niveau 0 est le plus dézoomé.
+    """
+    
+    def __init__(self, cache_dir: str, tile_size: int = 256, niveaux: int = 4, dpi_max: int = 150):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.tile_size = tile_size
+        self.niveaux = niveaux
+        self.dpi_max = dpi_max
+    
+    def _meta_path(self, empreinte: str) -> Path:
+        return self.cache_dir / empreinte / "meta.json"
+    
+    def est_en_cache(self, empreinte: str) -> bool:
+        return self._meta_path(empreinte).exists()
+    
+    def lire_meta(self, empreinte: str) -> Dict:
+        with open(self._meta_path(empreinte), encoding='utf-8') as f:
+            return json.load(f)
+    
+    def generer_pyramide(self, page) -> str:
+        """
+        Génère (si absente) la pyramide de tuiles d'une page.
+        
+        Returns:
+            Empreinte de la page, clé de la pyramide dans le cache
+        """
+        import fitz
+        from PIL import Image
+        
+        empreinte = empreinte_page(page)
+        if self.est_en_cache(empreinte):
+            logger.info(f"Page {page.number + 1}: tuiles déjà en cache ({empreinte[:12]})")
+            return empreinte
+        
+        echelle_max = self.dpi_max / 72
+        pix = page.get_pixmap(matrix=fitz.Matrix(echelle_max, echelle_max))
+        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        del pix
+        
+        dossier = self.cache_dir / empreinte
+        niveaux_meta = []
+        # Du niveau le plus détaillé au plus dézoomé, par divisions successives par 2
+        for niveau in reversed(range(self.niveaux)):
+            dossier_niveau = dossier / str(niveau)
+            dossier_niveau.mkdir(parents=True, exist_ok=True)
+            cols = -(-img.width // self.tile_size)
+            lignes = -(-img.height // self.tile_size)
+            for col in range(cols):
+                for ligne in range(lignes):
+                    x, y = col * self.tile_size, ligne * self.tile_size
+                    tuile = img.crop((x, y, min(x + self.tile_size, img.width),
+                                      min(y + self.tile_size, img.height)))
+                    tuile.save(dossier_niveau / f"{col}_{ligne}.png", "PNG")
+            niveaux_meta.append({
+                "niveau": niveau,
+                "echelle": echelle_max / 2 ** (self.niveaux - 1 - niveau),
+                "largeur": img.width,
+                "hauteur": img.height,
+                "cols": cols,
+                "lignes": lignes,
+            })
+            if niveau > 0:
+                img = img.reduce(2)
+        
+        meta = {
+            "tile_size": self.tile_size,
+            "page": page.number + 1,
+            "page_rect": [page.rect.width, page.rect.height],
+            "niveaux": sorted(niveaux_meta, key=lambda n: n["niveau"]),
+        }
+        # meta.json écrit en dernier : sa présence marque une pyramide complète
+        with open(self._meta_path(empreinte), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        
+        logger.info(f"✓ Pyramide de tuiles générée: page {page.number + 1} ({empreinte[:12]})")
+        return empreinte
+    
+    def assembler_vue(self, empreinte: str, niveau: int, centre: Tuple[float, float],
+                      taille_vue: Tuple[int, int] = (800, 600),
+                      surlignage: Optional[Tuple[float, float, float, float]] = None,
+                      label: Optional[str] = None):
+        """
+        Compose une vue (pan/zoom) à partir des tuiles en cache, sans rastérisation.
+        
+        Args:
+            empreinte: Clé de la pyramide
+            niveau: Niveau de zoom (0 = page entière réduite)
+            centre: Centre de la vue en coordonnées PDF (points)
+            taille_vue: Taille de l'image produite en pixels (largeur, hauteur)
+            surlignage: BBox PDF à encadrer en rouge (ex: zone.plan_bbox)
+            label: Texte affiché au-dessus du cadre
+            
+        Returns:
+            Image PIL de la vue
+        """
+        from PIL import Image, ImageDraw
+        
+        meta = self.lire_meta(empreinte)
+        niveau = max(0, min(niveau, len(meta["niveaux"]) - 1))
+        info = meta["niveaux"][niveau]
+        echelle = info["echelle"]
+        ts = meta["tile_size"]
+        
+        largeur = min(taille_vue[0], info["largeur"])
+        hauteur = min(taille_vue[1], info["hauteur"])
+        # Fenêtre en pixels du niveau, recalée dans les limites de l'image
+        vx0 = int(min(max(centre[0] * echelle - largeur / 2, 0), info["largeur"] - largeur))
+        vy0 = int(min(max(centre[1] * echelle - hauteur / 2, 0), info["hauteur"] - hauteur))
+        
+        vue = Image.new("RGB", (largeur, hauteur), "white")
+        dossier_niveau = self.cache_dir / empreinte / str(niveau)
+        for col in range(vx0 // ts, (vx0 + largeur - 1) // ts + 1):
+            for ligne in range(vy0 // ts, (vy0 + hauteur - 1) // ts + 1):
+                with Image.open(dossier_niveau / f"{col}_{ligne}.png") as tuile:
+                    vue.paste(tuile, (col * ts - vx0, ligne * ts - vy0))
+        
+        if surlignage:
+            x0, y0, x1, y1 = surlignage
+            draw = ImageDraw.Draw(vue)
+            padding = 10
+            rect = [x0 * echelle - vx0 - padding, y0 * echelle - vy0 - padding,
+                    x1 * echelle - vx0 + padding, y1 * echelle - vy0 + padding]
+            draw.rectangle(rect, outline="red", width=max(2, int(5 * echelle * 72 / self.dpi_max)))
+            if label:
+                draw.text((rect[0], rect[1] - 30), label, fill="red", font=_police_label())
+        
+        return vue
+    
+    def generer_pour_zones(self, pdf_path: SourcePDF, zones: List[ZoneDangereuse]) -> Dict[int, str]:
+        """
+        Génère les pyramides des pages de plans référencées par les zones.
+        
+        Returns:
+            Dictionnaire {numéro de page plan (1-based): empreinte}
+        """
+        pages = sorted({zone.plan_page for zone in zones if zone.plan_page})
+        empreintes = {}
+        with ouvrir_fitz(pdf_path) as doc:
+            for page_num in pages:
+                empreintes[page_num] = self.generer_pyramide(doc[page_num - 1])
+        return empreintes
+
+
 # ============================================================================
 # ÉTAPE 4 : GÉNÉRATION DU RAPPORT PDF
 # ============================================================================
 
+@lru_cache(maxsize=None)
+def _classe_emplacement_plan():
+    """Flowable reportlab (import paresseux) réservant la place d'un extrait de plan"""
+    from reportlab.platypus import Flowable
+    
+    class EmplacementPlan(Flowable):
+        """Cadre vide dont la position finale sur la page est relevée au rendu"""
+        
+        def __init__(self, zone: ZoneDangereuse, largeur: float, hauteur: float, emplacements: List):
+            super().__init__()
+            self.zone = zone
+            self.width = largeur
+            self.height = hauteur
+            self.emplacements = emplacements
+        
+        def wrap(self, *args):
+            return self.width, self.height
+        
+        def draw(self):
+            x, y = self.canv.absolutePosition(0, 0)
+            self.emplacements.append((self.canv.getPageNumber(), x, y, self.width, self.height, self.zone))
+    
+    return EmplacementPlan
+
+
 class ReportGenerator:
     """
     Génère la fiche réflexe PDF de 2 pages maximum.
+    
+    Deux modes pour les plans :
+    - "raster" : les crops PNG de ImageCropper sont insérés comme images
+    - "vecteur" : la région du plan original est recopiée en contenu vectoriel
+      (PyMuPDF show_pdf_page avec clip), cadre et label dessinés en vectoriel ;
+      aucun crop n'est nécessaire
     """
     
-    def __init__(self, output_path: str = "/home/claude/fiche_reflexe.pdf"):
+    MODES_PLANS = ("raster", "vecteur")
+    
+    def __init__(self, output_path: Optional[str] = "/home/claude/fiche_reflexe.pdf",
+                 crops: Optional[Dict[str, bytes]] = None,
+                 mode_plans: str = "raster",
+                 source_pdf: Optional[SourcePDF] = None):
+        """
+        Args:
+            output_path: Chemin du PDF ; None = PDF retourné en mémoire par generer()
+            crops: PNG en mémoire par id_zone (prioritaires sur plan_crop_path)
+            mode_plans: "raster" (crops PNG) ou "vecteur" (extraits du PDF source)
+            source_pdf: Rapport original, requis en mode "vecteur"
+        
+        Raises:
+            ValueError: Si le mode est inconnu ou si la source manque en mode vecteur
+        """
+        from reportlab.lib.styles import getSampleStyleSheet
+
+        if mode_plans not in self.MODES_PLANS:
+            raise ValueError(f"Mode plans inconnu: {mode_plans} (valeurs possibles: {', '.join(self.MODES_PLANS)})")
+        if mode_plans == "vecteur" and source_pdf is None:
+            raise ValueError("Le mode plans 'vecteur' nécessite le PDF source")
+        
         self.output_path = output_path
+        self.crops = crops or {}
+        self.mode_plans = mode_plans
+        self.source_pdf = charger_source_pdf(source_pdf) if source_pdf is not None else None
+        # (page fiche, x, y, largeur, hauteur, zone) relevés au rendu, repère reportlab
+        self._emplacements: List[Tuple] = []
         self.styles = getSampleStyleSheet()
         self._configurer_styles()
         
     def _configurer_styles(self):
         """Configuration des styles personnalisés"""
+        from reportlab.lib import colors
+        from reportlab.lib.enums import TA_CENTER
+        from reportlab.lib.styles import ParagraphStyle
+
         # Style pour titre principal
         self.styles.add(ParagraphStyle(
             name='CustomTitle',
@@ -634,6 +1945,9 @@ class ReportGenerator:
     
     def creer_entete(self) -> List:
         """Crée l'en-tête du rapport"""
+        from reportlab.lib.units import mm
+        from reportlab.platypus import Paragraph, Spacer
+
         story = []
         
         # Titre principal
@@ -657,6 +1971,9 @@ class ReportGenerator:
         Crée un bloc pour une zone dangereuse.
         Format: Texte à gauche, image du plan à droite.
         """
+        from reportlab.lib.units import mm
+        from reportlab.platypus import Table, TableStyle, Paragraph, Spacer, Image as RLImage
+
         story = []
         
         # Données textuelles
@@ -683,9 +2000,28 @@ class ReportGenerator:
         # Colonne texte
         texte_data = [[zone_title], [localisation], [materiau], [etat]]
         
-        if zone.plan_crop_path and Path(zone.plan_crop_path).exists():
+        # Crop paresseux : le rendu peut échouer (budget épuisé), d'où get()
+        crop = None if self.mode_plans == "vecteur" else self.crops.get(zone.id_zone)
+        if self.mode_plans == "vecteur":
+            image_source = None
+        elif crop:
+            image_source = io.BytesIO(crop)
+        elif zone.plan_crop_path and Path(zone.plan_crop_path).exists():
+            image_source = zone.plan_crop_path
+        else:
+            image_source = None
+        
+        if image_source or (self.mode_plans == "vecteur" and zone.plan_bbox):
             # Image disponible - Layout côte à côte
-            img = RLImage(zone.plan_crop_path, width=60*mm, height=60*mm)
+            if image_source:
+                # Crop éventuellement partagé avec des zones voisines : la légende désigne le cadre
+                img = [
+                    RLImage(image_source, width=60*mm, height=60*mm),
+                    Paragraph(f"Cadre « ZONE {zone.id_zone} »", self.styles['Details']),
+                ]
+            else:
+                # Emplacement rempli après coup par l'extrait vectoriel du plan
+                img = _classe_emplacement_plan()(zone, 60*mm, 60*mm, self._emplacements)
             
             # Table 2 colonnes: texte | image
             table_data = [
@@ -721,7 +2057,7 @@ class ReportGenerator:
         
         return story
     
-    def generer(self, zones: List[ZoneDangereuse], metadata: ReportMetadata) -> str:
+    def generer(self, zones: List[ZoneDangereuse], metadata: ReportMetadata) -> Union[str, bytes]:
         """
         Génère le PDF de la fiche réflexe.
         
@@ -730,13 +2066,20 @@ class ReportGenerator:
             metadata: Métadonnées du rapport
             
         Returns:
-            Chemin du fichier PDF généré
+            Chemin du fichier PDF généré, ou son contenu si output_path est None
         """
-        logger.info(f"Génération du rapport: {self.output_path}")
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.units import mm
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+
+        logger.info(f"Génération du rapport: {self.output_path or 'en mémoire'}")
+        self._emplacements.clear()
         
-        # Configuration du document
+        # Configuration du document (en mémoire si les plans vectoriels restent à incruster)
+        vecteur = self.mode_plans == "vecteur"
+        destination = io.BytesIO() if vecteur or self.output_path is None else self.output_path
         doc = SimpleDocTemplate(
-            self.output_path,
+            destination,
             pagesize=A4,
             rightMargin=15*mm,
             leftMargin=15*mm,
@@ -775,9 +2118,402 @@ class ReportGenerator:
         
         # Construction du PDF
         doc.build(story)
-        logger.info(f"✓ Rapport PDF généré: {self.output_path}")
         
+        if vecteur:
+            contenu = self._incruster_plans_vectoriels(destination.getvalue())
+            if self.output_path is None:
+                logger.info("✓ Rapport PDF (plans vectoriels) généré en mémoire")
+                return contenu
+            with open(self.output_path, 'wb') as f:
+                f.write(contenu)
+            logger.info(f"✓ Rapport PDF (plans vectoriels) généré: {self.output_path}")
+            return self.output_path
+        
+        if self.output_path is None:
+            logger.info("✓ Rapport PDF généré en mémoire")
+            return destination.getvalue()
+        
+        logger.info(f"✓ Rapport PDF généré: {self.output_path}")
         return self.output_path
+    
+    def _incruster_plans_vectoriels(self, fiche: bytes) -> bytes:
+        """
+        Recopie dans chaque emplacement la région du plan source (vectoriel, sans
+        rastérisation), puis dessine le cadre rouge et le label de la zone.
+        """
+        import fitz
+        
+        if not self._emplacements:
+            return fiche
+        
+        with fitz.open(stream=fiche, filetype="pdf") as doc, ouvrir_fitz(self.source_pdf) as source:
+            for page_fiche, x, y, largeur, hauteur, zone in self._emplacements:
+                page = doc[page_fiche - 1]
+                plan = source[zone.plan_page - 1]
+                clip = ImageCropper.rect_crop(zone.plan_bbox, plan.rect)
+                if clip.is_empty:
+                    continue
+                
+                # Repère reportlab (origine en bas à gauche) → repère PyMuPDF
+                cible = fitz.Rect(x, page.rect.height - y - hauteur, x + largeur, page.rect.height - y)
+                page.show_pdf_page(cible, source, zone.plan_page - 1, clip=clip)
+                
+                # show_pdf_page centre le clip en conservant ses proportions
+                echelle = min(cible.width / clip.width, cible.height / clip.height)
+                ox = cible.x0 + (cible.width - clip.width * echelle) / 2
+                oy = cible.y0 + (cible.height - clip.height * echelle) / 2
+                x0, y0, x1, y1 = zone.plan_bbox
+                padding = 10 * 72 / 200 * echelle  # Même marge que les crops raster
+                cadre = fitz.Rect(
+                    ox + (x0 - clip.x0) * echelle - padding,
+                    oy + (y0 - clip.y0) * echelle - padding,
+                    ox + (x1 - clip.x0) * echelle + padding,
+                    oy + (y1 - clip.y0) * echelle + padding,
+                )
+                page.draw_rect(cadre, color=(1, 0, 0), width=1.5)
+                page.insert_text((cadre.x0, cadre.y0 - 3), f"ZONE {zone.id_zone}",
+                                 fontname="hebo", fontsize=7, color=(1, 0, 0))
+            
+            return doc.tobytes(garbage=3, deflate=True)
+
+
+class AnnotateurRapport:
+    """
+    Rapport original annoté : chaque zone positive surlignée sur sa page de
+    tableau et encadrée sur son plan.
+    
+    Les annotations sont ajoutées par sauvegarde incrémentale : le fichier
+    produit commence par les octets du rapport d'origine, inchangés, suivis
+    d'une mise à jour contenant uniquement les annotations. Rien n'est réécrit,
+    même pour un rapport de plusieurs centaines de pages.
+    """
+    
+    COULEUR_TABLEAU = (1, 0.6, 0)  # Orange
+    COULEUR_PLAN = (1, 0, 0)  # Rouge
+    
+    def __init__(self, source_pdf: SourcePDF, output_path: Optional[str] = "/home/claude/rapport_annote.pdf"):
+        """
+        Args:
+            source_pdf: Rapport original (chemin ou contenu en mémoire)
+            output_path: Fichier produit ; None = rapport annoté retourné en octets
+        """
+        self.source_pdf = charger_source_pdf(source_pdf)
+        self.output_path = output_path
+    
+    @staticmethod
+    def lignes_id(page, zone_id: str) -> List:
+        """
+        Rectangles des lignes de la page où l'ID apparaît comme mot entier
+        (P12 ne surligne pas P123). Repli sur search_for pour les IDs en
+        plusieurs mots.
+        """
+        import fitz
+        
+        mots = page.get_text("words")  # (x0, y0, x1, y1, mot, bloc, ligne, n°)
+        cles = {mot[5:7] for mot in mots if mot[4].strip("()[]{}.,;:").upper() == zone_id}
+        if not cles:
+            return page.search_for(zone_id)
+        lignes = {}
+        for mot in mots:
+            if mot[5:7] in cles:
+                lignes[mot[5:7]] = lignes.get(mot[5:7], fitz.Rect(mot[:4])) | fitz.Rect(mot[:4])
+        return list(lignes.values())
+    
+    def annoter_page_tableau(self, page, zone: ZoneDangereuse) -> int:
+        """Surligne les lignes de la zone sur sa page source ; retourne le nombre d'annotations"""
+        lignes = self.lignes_id(page, zone.id_zone)
+        for rect in lignes:
+            annot = page.add_highlight_annot(rect)
+            annot.set_colors(stroke=self.COULEUR_TABLEAU)
+            annot.set_info(title="Amiante", content=(
+                f"ZONE {zone.id_zone} - {zone.risque_niveau}\n{zone.materiau} - {zone.etat}"
+            ))
+            annot.update()
+        return len(lignes)
+    
+    def annoter_plan(self, page, zone: ZoneDangereuse):
+        """Encadre la zone sur son plan (même marge que les crops) avec son libellé"""
+        import fitz
+        
+        padding = 10 * 72 / 200
+        cadre = fitz.Rect(zone.plan_bbox) + (-padding, -padding, padding, padding)
+        annot = page.add_rect_annot(cadre)
+        annot.set_colors(stroke=self.COULEUR_PLAN)
+        annot.set_border(width=2)
+        annot.set_info(title="Amiante", content=(
+            f"ZONE {zone.id_zone} - {zone.risque_niveau}\n{zone.localisation_texte}"
+            + (f"\nPièce: {zone.plan_piece}" if zone.plan_piece else "")
+        ))
+        annot.update()
+        
+        libelle = fitz.Rect(cadre.x0, cadre.y0 - 12, cadre.x0 + 70, cadre.y0 - 1)
+        annot = page.add_freetext_annot(libelle, f"ZONE {zone.id_zone}", fontsize=7,
+                                        fontname="helv", text_color=self.COULEUR_PLAN)
+        annot.update()
+    
+    def annoter(self, zones: List[ZoneDangereuse]) -> Union[str, bytes]:
+        """
+        Returns:
+            Chemin du rapport annoté, ou ses octets si output_path est None
+        """
+        import fitz
+        import shutil
+        import tempfile
+        
+        # La sauvegarde incrémentale exige un fichier : copie du rapport d'origine
+        if self.output_path is None:
+            fd, cible = tempfile.mkstemp(suffix=".pdf")
+            os.close(fd)
+        else:
+            cible = str(self.output_path)
+        if isinstance(self.source_pdf, bytes):
+            Path(cible).write_bytes(self.source_pdf)
+        else:
+            shutil.copyfile(self.source_pdf, cible)
+        
+        try:
+            surlignages = encadrements = 0
+            with fitz.open(cible) as doc:
+                for zone in zones:
+                    if 1 <= zone.page_source <= len(doc):
+                        surlignages += self.annoter_page_tableau(doc[zone.page_source - 1], zone)
+                    if zone.plan_page and zone.plan_bbox:
+                        self.annoter_plan(doc[zone.plan_page - 1], zone)
+                        encadrements += 1
+                
+                if doc.can_save_incrementally():
+                    doc.saveIncr()
+                else:
+                    # PDF réparé à l'ouverture : seule une réécriture complète est possible
+                    logger.warning("⚠ Sauvegarde incrémentale impossible (PDF réparé), réécriture complète")
+                    doc.save(cible + ".tmp")
+            if Path(cible + ".tmp").exists():
+                os.replace(cible + ".tmp", cible)
+            
+            logger.info(f"✓ Rapport annoté: {surlignages} surlignage(s), {encadrements} zone(s) encadrée(s) sur plan")
+            if self.output_path is None:
+                return Path(cible).read_bytes()
+            return cible
+        finally:
+            if self.output_path is None:
+                Path(cible).unlink(missing_ok=True)
+
+
+# ============================================================================
+# ANALYSE INCRÉMENTALE (RÉVISIONS D'UN MÊME RAPPORT)
+# ============================================================================
+
+class PageResultStore:
+    """
+    Résultats par page d'une révision de rapport, indexés par empreinte de page.
+    
+    Une page dont l'empreinte figure déjà dans le store n'est ni ré-extraite,
+    ni ré-classifiée, ni re-cherchée ; un crop n'est régénéré que si sa page
+    de plan, sa bbox ou son groupe (crop partagé) a changé.
+    """
+    
+    VERSION = 3  # 2 : recherches qualifiées (score, légende) ; 3 : empreintes couvrant les XObjects
+    
+    def __init__(self, path: str):
+        self.path = Path(path)
+        # {empreinte: {"zones": [...], "est_plan": bool|None, "recherches": {id: {...}|None}}}
+        self.pages: Dict[str, Dict] = {}
+        self.zones: List[Dict] = []  # Zones finales de la révision
+        self.crops: Dict[str, Dict] = {}  # {id_zone: {"empreinte", "bbox", "path", "groupe"}}
+        self.profil: Optional[str] = None  # Profil laboratoire utilisé pour l'extraction
+    
+    @classmethod
+    def charger(cls, path: str) -> "PageResultStore":
+        """Charge le store ; retourne un store vide s'il est absent ou illisible"""
+        store = cls(path)
+        if not store.path.exists():
+            return store
+        try:
+            with open(store.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Store {path} illisible, analyse complète: {e}")
+            return store
+        if data.get("version") != cls.VERSION:
+            logger.warning(f"Store {path}: version {data.get('version')} ignorée")
+            return store
+        store.pages = data.get("pages", {})
+        store.zones = data.get("zones", [])
+        store.crops = data.get("crops", {})
+        store.profil = data.get("profil")
+        return store
+    
+    def sauvegarder(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "version": self.VERSION,
+                "pages": self.pages,
+                "zones": self.zones,
+                "crops": self.crops,
+                "profil": self.profil,
+            }, f, ensure_ascii=False)
+        logger.info(f"✓ Store incrémental sauvegardé: {self.path}")
+    
+    @staticmethod
+    def calculer_empreintes(pdf_path: SourcePDF) -> List[str]:
+        """Empreinte de chaque page du document (index 0-based)"""
+        with ouvrir_fitz(pdf_path) as doc:
+            memo: Dict[int, bytes] = {}
+            return [empreinte_page(page, memo) for page in doc]
+    
+    @staticmethod
+    def comparer_zones(anciennes: List[Dict], nouvelles: List[Dict]) -> Dict:
+        """
+        Diff au niveau zone entre deux révisions (clé = id_zone).
+        Le chemin du crop n'est pas comparé.
+        """
+        def normaliser(zone: Dict) -> Dict:
+            zone = json.loads(json.dumps(zone))  # tuples → listes
+            zone.pop("plan_crop_path", None)
+            return zone
+        
+        avant = {z["id_zone"]: normaliser(z) for z in anciennes}
+        apres = {z["id_zone"]: normaliser(z) for z in nouvelles}
+        
+        modifiees = []
+        for id_zone in apres.keys() & avant.keys():
+            champs = {
+                champ: [avant[id_zone].get(champ), valeur]
+                for champ, valeur in apres[id_zone].items()
+                if avant[id_zone].get(champ) != valeur
+            }
+            if champs:
+                modifiees.append({"id_zone": id_zone, "champs": champs})
+        
+        return {
+            "ajoutees": sorted(apres.keys() - avant.keys()),
+            "supprimees": sorted(avant.keys() - apres.keys()),
+            "modifiees": sorted(modifiees, key=lambda m: m["id_zone"]),
+            "inchangees": len(apres.keys() & avant.keys()) - len(modifiees),
+        }
+
+
+# ============================================================================
+# PROFILAGE DES ÉTAPES
+# ============================================================================
+
+class StageProfiler:
+    """
+    Profilage opt-in des étapes du pipeline, en deux passes distinctes :
+    
+    - temps (défaut) : cProfile seul, <dossier>/<etape>.prof (lisible avec
+      pstats/snakeviz). cProfile gonfle lui aussi le code Python (x2 à x3 sur
+      l'extraction pdfplumber), bien moins les appels MuPDF : à garder en tête
+      en comparant les étapes ;
+    - allocations : tracemalloc seul, <dossier>/<etape>_allocations.txt
+      (principaux sites d'allocation Python ; la mémoire allouée en C par
+      MuPDF n'y figure pas). tracemalloc ralentit fortement le code Python
+      (x5 à x10 sur l'extraction) mais peu les appels MuPDF : les durées de
+      cette passe ne sont pas comparables entre étapes.
+    
+    Les deux ne sont jamais actifs ensemble, pour que les .prof ne soient pas
+    faussés par le traçage des allocations.
+    Désactivé, le profiler n'ajoute aucun coût.
+    """
+    
+    def __init__(self, dossier: Optional[str] = None, top_allocations: int = 25,
+                 allocations: bool = False):
+        self.dossier = Path(dossier) if dossier else None
+        self.top_allocations = top_allocations
+        self.allocations = allocations
+        self.resultats: Dict[str, Dict] = {}
+        if self.dossier:
+            self.dossier.mkdir(parents=True, exist_ok=True)
+    
+    @property
+    def actif(self) -> bool:
+        return self.dossier is not None
+    
+    @contextmanager
+    def etape(self, nom: str):
+        """Profile le bloc de code d'une étape si le profilage est actif"""
+        if not self.actif:
+            yield
+            return
+        if self.allocations:
+            with self._etape_allocations(nom):
+                yield
+            return
+        
+        import cProfile
+        
+        profiler = cProfile.Profile()
+        debut = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            duree = time.perf_counter() - debut
+            prof_path = self.dossier / f"{nom}.prof"
+            profiler.dump_stats(str(prof_path))
+            self.resultats[nom] = {
+                "duree_s": round(duree, 4),
+                "prof": str(prof_path),
+            }
+            logger.info(f"⏱ Profil étape '{nom}': {duree:.3f} s → {prof_path}")
+    
+    @contextmanager
+    def _etape_allocations(self, nom: str):
+        """Passe allocations : tracemalloc (1 frame suffit aux stats par ligne), sans cProfile"""
+        import tracemalloc
+        
+        deja_actif = tracemalloc.is_tracing()
+        if not deja_actif:
+            tracemalloc.start(1)
+        tracemalloc.reset_peak()
+        avant = tracemalloc.take_snapshot()
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            duree = time.perf_counter() - debut
+            apres = tracemalloc.take_snapshot()
+            _, pic = tracemalloc.get_traced_memory()
+            if not deja_actif:
+                tracemalloc.stop()
+            
+            alloc_path = self.dossier / f"{nom}_allocations.txt"
+            stats = apres.compare_to(avant, "lineno")
+            with open(alloc_path, 'w', encoding='utf-8') as f:
+                f.write(f"Étape: {nom}\n")
+                f.write(f"Durée (sous tracemalloc, non représentative): {duree:.3f} s\n")
+                f.write(f"Pic mémoire tracée: {pic / 1024 / 1024:.1f} Mo\n\n")
+                f.write(f"Top {self.top_allocations} sites d'allocation (delta sur l'étape):\n")
+                for stat in stats[:self.top_allocations]:
+                    f.write(f"{stat}\n")
+            
+            self.resultats[nom] = {
+                "duree_s": round(duree, 4),
+                "pic_memoire_octets": pic,
+                "allocations": str(alloc_path),
+            }
+            logger.info(f"⏱ Allocations étape '{nom}': pic {pic / 1024 / 1024:.1f} Mo → {alloc_path}")
+
+
+def _extraire_vers_file(source, pages: Optional[List[int]], file, budget: BudgetTemps, profil: str):
+    """
+    Processus d'extraction du mode pipeline : pousse (page, zones) page par page
+    dans la file, puis ("degradations", [...], {étape: résultats dégradés}) et None.
+    Une erreur est transmise
+    sous forme de message texte.
+    """
+    try:
+        with TextExtractor(source, budget, profil) as extractor:
+            for page_num, page in enumerate(extractor.pdf.pages, start=1):
+                if pages is None or page_num in pages:
+                    file.put((page_num, extractor.extraire_zones_page(page, page_num)))
+                page.close()
+        file.put(("degradations", budget.degradations, budget.degrades))
+        file.put(None)
+    except Exception as e:
+        file.put(f"{type(e).__name__}: {e}")
 
 
 # ============================================================================
@@ -789,121 +2525,855 @@ class AsbestosReportAnalyzer:
     Orchestrateur principal du pipeline d'analyse.
     """
     
-    def __init__(self, pdf_path: str, output_dir: str = "/home/claude"):
-        self.pdf_path = pdf_path
+    def __init__(self, pdf_path: SourcePDF, output_dir: str = "/home/claude",
+                 etapes: Optional[Iterable[str]] = None,
+                 tiles_dir: Optional[str] = None,
+                 store_path: Optional[str] = None,
+                 profile: bool = False,
+                 profile_allocations: bool = False,
+                 filename: Optional[str] = None,
+                 en_memoire: bool = False,
+                 pipeline: bool = False,
+                 taille_file: int = 8,
+                 budget_document_s: Optional[float] = None,
+                 budget_page_s: Optional[float] = None,
+                 profil_laboratoire: Optional[str] = None,
+                 mode_plans: str = "raster",
+                 crops_paresseux: bool = False,
+                 rapport_annote: bool = False):
+        # Chemin ou contenu en mémoire, lu une seule fois et partagé par les étapes
+        self.pdf_path = charger_source_pdf(pdf_path)
+        self.filename = filename or (
+            Path(self.pdf_path).name if isinstance(self.pdf_path, str) else "rapport.pdf"
+        )
+        
+        # Mode mémoire : fiche PDF, JSON et crops retournés dans "artifacts", rien n'est écrit
+        self.en_memoire = en_memoire
         self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(exist_ok=True)
+        if not en_memoire:
+            self.output_dir.mkdir(exist_ok=True)
+        
+        # Étapes à exécuter (pipeline complet par défaut)
+        self.etapes = normaliser_etapes(etapes)
+        
+        # Plans de la fiche : crops PNG ("raster") ou extraits vectoriels ("vecteur")
+        if mode_plans not in ReportGenerator.MODES_PLANS:
+            raise ValueError(f"Mode plans inconnu: {mode_plans}")
+        self.mode_plans = mode_plans
+        
+        # Crops rendus au premier accès (artifacts["crops"] / fiche) au lieu de tous d'avance
+        self.crops_paresseux = crops_paresseux
+        if mode_plans == "vecteur" and "report" in self.etapes:
+            # Les extraits vectoriels ont besoin des plans liés, pas des crops :
+            # ceux-ci ne sont rendus que si l'étape a été demandée explicitement
+            if etapes is None:
+                self.etapes = tuple(e for e in self.etapes if e != "crop")
+            self.etapes = normaliser_etapes(self.etapes + ("link",))
+        
+        # Export du rapport original annoté (sauvegarde incrémentale)
+        self.rapport_annote = rapport_annote
+        
+        # Exécution concurrente extraction / liaison+crops (file bornée à taille_file pages)
+        self.pipeline = pipeline
+        self.taille_file = taille_file
+        
+        # Budgets de temps (secondes) au-delà desquels l'analyse se dégrade
+        self.budget_document_s = budget_document_s
+        self.budget_page_s = budget_page_s
+        
+        # Profil laboratoire imposé (None = détection sur les premières pages)
+        if profil_laboratoire is not None and profil_laboratoire not in PROFILS_LABORATOIRES:
+            raise ValueError(
+                f"Profil laboratoire inconnu: {profil_laboratoire} "
+                f"(valeurs possibles: {', '.join(PROFILS_LABORATOIRES)})"
+            )
+        self.profil_laboratoire = profil_laboratoire
+        
+        # Résultat de probe() si déjà appelé
+        self._probe: Optional[ReportProbe] = None
+        
+        # Cache de tuiles des plans (pan/zoom), partagé entre analyses si fourni
+        self.tiles_dir = Path(tiles_dir) if tiles_dir else None
+        
+        # Store par page de la révision précédente (analyse incrémentale) si fourni
+        self.store_path = Path(store_path) if store_path else None
         
         # Chemins de sortie
         self.json_output = self.output_dir / "zones_dangereuses.json"
         self.pdf_output = self.output_dir / "fiche_reflexe.pdf"
+        self.annote_output = self.output_dir / "rapport_annote.pdf"
         self.crops_dir = self.output_dir / "crops"
+        self.profile_dir = self.output_dir / "profiling" if profile or profile_allocations else None
+        self.profile_allocations = profile_allocations
+        
+    # Seuils de classe de coût (pages, octets bruts des flux de contenu cumulés)
+    SEUILS_COUT = {
+        "lourd": (300, 5_000_000),
+        "moyen": (50, 500_000),
+    }
+    
+    @staticmethod
+    def _longueur_flux(doc, xref: int) -> int:
+        """/Length d'un flux, lue dans son dictionnaire sans le décompresser"""
+        type_valeur, valeur = doc.xref_get_key(xref, "Length")
+        if type_valeur == "xref":
+            # Longueur indirecte ("12 0 R") : objet entier à part
+            valeur = doc.xref_object(int(valeur.split()[0]), compressed=True)
+        try:
+            return int(valeur)
+        except ValueError:
+            return 0
+    
+    @classmethod
+    def _octets_contenu(cls, doc, page) -> int:
+        """
+        Somme des /Length des flux de contenu de la page et des XObjects de
+        formulaire qu'elle dessine (plans vectoriels encapsulés par les exports
+        CAO ou les fusions de PDF), sans les décompresser. Le coût dépend du
+        nombre de flux, pas de leur taille.
+        """
+        _, contents = doc.xref_get_key(page.xref, "Contents")  # "6 0 R" ou "[6 0 R 7 0 R]"
+        xrefs = [int(xref) for xref in re.findall(r"(\d+)\s+\d+\s+R", contents)]
+        xrefs += [xobject[0] for xobject in page.get_xobjects()]
+        return sum(cls._longueur_flux(doc, xref) for xref in dict.fromkeys(xrefs))
+    
+    def probe(self) -> ReportProbe:
+        """
+        Sondage rapide de la structure du PDF, sans extraction de texte ni rendu.
+        
+        Ne lit que les ressources (polices, images) et la longueur déclarée des
+        flux de contenu de chaque page, sans les décompresser ; sert à estimer
+        le coût d'une analyse avant de la lancer (routage vers des workers
+        dédiés aux rapports lourds).
         
-    def analyser(self) -> Dict:
+        Returns:
+            ReportProbe (mis en cache : total_pages réutilisé par analyser())
         """
-        Pipeline complet d'analyse.
+        debut = time.monotonic()
+        with ouvrir_fitz(self.pdf_path) as doc:
+            chiffre = bool(doc.needs_pass)
+            pages = []
+            if not chiffre:
+                for page in doc:
+                    rect = page.rect
+                    paysage = rect.width > rect.height
+                    images = len(page.get_images())
+                    try:
+                        octets = self._octets_contenu(doc, page)
+                    except Exception:
+                        octets = 0
+                    pages.append(PageProbe(
+                        page=page.number + 1,
+                        paysage=paysage,
+                        a_couche_texte=bool(page.get_fonts()),
+                        images=images,
+                        octets_contenu=octets,
+                        # Approximation de PlanDetector.est_page_plan ((paysage et peu de
+                        # texte) ou images) : sans lire le texte, tout paysage compte
+                        plan_probable=paysage or images > 0,
+                    ))
+            total_pages = len(doc)
+        
+        if chiffre:
+            classe_cout = "bloque"
+        else:
+            octets_totaux = sum(p.octets_contenu for p in pages)
+            classe_cout = "leger"
+            for classe, (seuil_pages, seuil_octets) in self.SEUILS_COUT.items():
+                if total_pages > seuil_pages or octets_totaux > seuil_octets:
+                    classe_cout = classe
+                    break
+        
+        self._probe = ReportProbe(
+            total_pages=total_pages,
+            chiffre=chiffre,
+            couverture_texte=round(sum(p.a_couche_texte for p in pages) / total_pages, 3) if pages else 0.0,
+            pages_plans_estimees=[p.page for p in pages if p.plan_probable],
+            classe_cout=classe_cout,
+            duree_ms=round((time.monotonic() - debut) * 1000, 2),
+            pages=pages,
+        )
+        logger.info(
+            f"Sondage: {total_pages} pages, couverture texte {self._probe.couverture_texte:.0%}, "
+            f"{len(self._probe.pages_plans_estimees)} plans estimés, coût {classe_cout} "
+            f"({self._probe.duree_ms} ms)"
+        )
+        return self._probe
+    
+    def _zones_par_page_precedentes(self, empreintes: List[str], precedent: "PageResultStore",
+                                     pages_scannees: Iterable[int]) -> Dict[int, List[ZoneDangereuse]]:
+        """Zones des pages inchangées, reprises du store (page_source renumérotée)"""
+        pages_scannees = set(pages_scannees)
+        return {
+            num: [ZoneDangereuse(**{**zone, "page_source": num})
+                  for zone in precedent.pages[empreinte]["zones"]]
+            for num, empreinte in enumerate(empreintes, start=1)
+            if num not in pages_scannees
+        }
+    
+    def _crops_precedents(self, zones: List[ZoneDangereuse], empreintes: Optional[List[str]],
+                          precedent: Optional["PageResultStore"]) -> List[ZoneDangereuse]:
+        """
+        Reprend les crops de la révision précédente toujours valides, groupe par
+        groupe : un crop partagé n'est repris que si son groupe est inchangé
+        (mêmes zones) et que chaque zone garde sa page et son cadre.
         
         Returns:
-            Dictionnaire avec résultats et statistiques
+            Zones dont le crop reste à générer
         """
-        from datetime import datetime
+        if not precedent or self.en_memoire:
+            return zones
+        a_generer = [zone for zone in zones if not (zone.plan_page and zone.plan_bbox)]
+        for groupe in ImageCropper.regrouper_zones(zones):
+            ids = sorted(zone.id_zone for zone in groupe)
+            crops = [precedent.crops.get(zone.id_zone) for zone in groupe]
+            if all(crop
+                   and crop.get("groupe") == ids
+                   and crop["empreinte"] == empreintes[zone.plan_page - 1]
+                   and crop["bbox"] == list(zone.plan_bbox)
+                   and Path(crop["path"]).exists()
+                   for zone, crop in zip(groupe, crops)):
+                for zone, crop in zip(groupe, crops):
+                    zone.plan_crop_path = crop["path"]
+            else:
+                a_generer.extend(groupe)
+        return a_generer
+    
+    def _analyser_en_sequence(self, profiler: StageProfiler, budget: BudgetTemps, profil: str,
+                              empreintes, precedent, pages_a_scanner):
+        """
+        Étapes 1 à 3 exécutées l'une après l'autre.
         
-        logger.info("="*80)
-        logger.info("DÉMARRAGE ANALYSE RAPPORT AMIANTE")
-        logger.info("="*80)
+        Returns:
+            (zones, zones extraites par empreinte, résultats plans par empreinte,
+             crops en mémoire, nombre de zones avec plan)
+        """
+        zones_extraites = {}
+        resultats_plans = {}
+        crops_memoire: Dict[str, bytes] = {}
         
         # Étape 1: Extraction textuelle
         logger.info("\n[ÉTAPE 1/4] Extraction textuelle structurée")
         logger.info("-" * 80)
         
-        with TextExtractor(self.pdf_path) as extractor:
-            zones = extractor.extraire_zones_dangereuses()
+        with profiler.etape("extract"):
+            with TextExtractor(self.pdf_path, budget, profil) as extractor:
+                if empreintes is None:
+                    zones = extractor.extraire_zones_dangereuses()
+                else:
+                    zones_par_page = extractor.extraire_zones_par_page(pages_a_scanner)
+                    zones_par_page.update(
+                        self._zones_par_page_precedentes(empreintes, precedent, pages_a_scanner)
+                    )
+                    # Sérialisé avant la liaison, qui modifie les zones
+                    zones_extraites = {
+                        empreintes[num - 1]: [zone.to_dict() for zone in zones_page]
+                        for num, zones_page in zones_par_page.items()
+                    }
+                    zones = TextExtractor.dedoublonner(zones_par_page)
         
         if not zones:
-            logger.error("❌ Aucune zone dangereuse détectée. Vérifier le format du PDF.")
-            return {"error": "Aucune zone détectée"}
+            return zones, zones_extraites, resultats_plans, crops_memoire, 0
         
         # Étape 2: Liaison avec les plans
-        logger.info("\n[ÉTAPE 2/4] Identification et liaison des plans")
-        logger.info("-" * 80)
+        if "link" in self.etapes:
+            logger.info("\n[ÉTAPE 2/4] Identification et liaison des plans")
+            logger.info("-" * 80)
+            
+            with profiler.etape("link"):
+                with PlanDetector(self.pdf_path, empreintes,
+                                  precedent.pages if precedent else None, budget) as detector:
+                    zones = detector.lier_zones_aux_plans(zones)
+                resultats_plans = detector.resultats_pages
+        else:
+            logger.info("\n[ÉTAPE 2/4] Liaison des plans: ignorée")
         
-        with PlanDetector(self.pdf_path) as detector:
-            zones = detector.lier_zones_aux_plans(zones)
+        crops_memoire, zones_avec_plans = self._generer_crops(profiler, zones, budget, empreintes, precedent)
+        return zones, zones_extraites, resultats_plans, crops_memoire, zones_avec_plans
+    
+    def _generer_crops(self, profiler: StageProfiler, zones: List[ZoneDangereuse], budget: BudgetTemps,
+                       empreintes=None, precedent=None) -> Tuple[Dict[str, bytes], int]:
+        """
+        Étape 3 hors pipeline.
+        
+        Returns:
+            (crops en mémoire, nombre de zones avec plan)
+        """
+        if "crop" not in self.etapes or self.crops_paresseux:
+            logger.info("\n[ÉTAPE 3/4] Génération des crops: "
+                        + ("à la demande" if "crop" in self.etapes else "ignorée"))
+            return {}, sum(1 for zone in zones if zone.plan_bbox)
         
-        # Étape 3: Génération des crops
         logger.info("\n[ÉTAPE 3/4] Génération des assets visuels")
         logger.info("-" * 80)
         
-        with ImageCropper(self.pdf_path, str(self.crops_dir)) as cropper:
-            crops_count = cropper.generer_tous_les_crops(zones)
+        with profiler.etape("crop"):
+            a_generer = self._crops_precedents(zones, empreintes, precedent)
+            if precedent:
+                logger.info(f"Crops repris de la révision précédente: {len(zones) - len(a_generer)}")
+            
+            crops_dir = None if self.en_memoire else str(self.crops_dir)
+            with ImageCropper(self.pdf_path, crops_dir, budget) as cropper:
+                zones_avec_plans = cropper.generer_tous_les_crops(a_generer) + len(zones) - len(a_generer)
+        return cropper.crops, zones_avec_plans
+    
+    def _resoudre_profil(self) -> str:
+        """Profil laboratoire imposé, sinon détecté sur les premières pages du document"""
+        if self.profil_laboratoire is not None:
+            return self.profil_laboratoire
+        with TextExtractor(self.pdf_path) as extractor:
+            return extractor.profil_actif().nom
+    
+    def analyser_plage(self, premiere_page: int, derniere_page: int) -> ResultatPartiel:
+        """
+        Étapes 1 et 2 sur une plage de pages (1-based, incluse), pour répartir
+        un document sur plusieurs nœuds.
         
-        # Étape 4: Génération du rapport PDF
-        logger.info("\n[ÉTAPE 4/4] Génération de la fiche réflexe")
-        logger.info("-" * 80)
+        Chaque nœud reçoit le PDF complet : le profil laboratoire est détecté sur
+        les premières pages du document, comme pour une analyse complète. La
+        liaison est différée à la fusion : les pages de plans de la plage sont
+        seulement indexées (jetons ressemblant à un ID).
         
-        metadata = ReportMetadata(
-            filename=Path(self.pdf_path).name,
-            total_pages=0,  # À implémenter si nécessaire
-            zones_detectees=len(zones),
-            zones_avec_plans=crops_count,
-            date_traitement=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        Returns:
+            Résultat partiel sérialisable (to_dict / from_dict)
+        """
+        logger.info(f"Analyse partielle: pages {premiere_page} à {derniere_page}")
+        budget = BudgetTemps(self.budget_document_s, self.budget_page_s)
+        profil = self._resoudre_profil()
+        
+        with PlanDetector(self.pdf_path, budget=budget) as detector:
+            total_pages = len(detector.doc)
+            if not 1 <= premiere_page <= derniere_page <= total_pages:
+                raise ValueError(
+                    f"Plage de pages invalide: {premiere_page}-{derniere_page} (document de {total_pages} pages)"
+                )
+            pages = range(premiere_page, derniere_page + 1)
+            
+            with TextExtractor(self.pdf_path, budget, profil) as extractor:
+                zones_par_page = extractor.extraire_zones_par_page(pages)
+            
+            pages_plans = []
+            if "link" in self.etapes:
+                pages_plans = [num + 1 for num in detector.identifier_pages_plans(num - 1 for num in pages)]
+            index_plans = {num: detector.indexer_identifiants(detector.doc[num - 1]) for num in pages_plans}
+            memo_empreintes: Dict[int, bytes] = {}
+            meta_pages = {
+                num: {
+                    "empreinte": empreinte_page(detector.doc[num - 1], memo_empreintes),
+                    "est_plan": num in pages_plans,
+                    "zones": len(zones_par_page[num]),
+                }
+                for num in pages
+            }
+        
+        return ResultatPartiel(
+            premiere_page=premiere_page,
+            derniere_page=derniere_page,
+            total_pages=total_pages,
+            profil=profil,
+            zones_par_page={num: [zone.to_dict() for zone in zones] for num, zones in zones_par_page.items()},
+            index_plans=index_plans,
+            pages=meta_pages,
+            degradations=budget.degradations,
         )
+    
+    def _fusionner(self, partiels: List[ResultatPartiel]) -> Tuple[List[ZoneDangereuse], int]:
+        """
+        Étapes 1 et 2 reconstituées à partir des résultats partiels : mêmes zones
+        et mêmes liaisons qu'une analyse du document entier.
+        
+        Returns:
+            (zones, nombre de zones avec plan)
+        """
+        partiels = sorted(partiels, key=lambda partiel: partiel.premiere_page)
+        total_pages = partiels[0].total_pages
+        attendue = 1
+        for partiel in partiels:
+            if partiel.total_pages != total_pages or partiel.profil != partiels[0].profil:
+                raise ValueError("Résultats partiels issus de documents ou de profils différents")
+            if partiel.premiere_page != attendue:
+                raise ValueError(f"Résultats partiels non contigus: page {attendue} manquante ou en double")
+            attendue = partiel.derniere_page + 1
+        if attendue != total_pages + 1:
+            raise ValueError(f"Résultats partiels incomplets: pages {attendue} à {total_pages} manquantes")
+        
+        zones_par_page = {
+            num: [ZoneDangereuse(**zone) for zone in zones]
+            for partiel in partiels for num, zones in partiel.zones_par_page.items()
+        }
+        zones = TextExtractor.dedoublonner(zones_par_page)
         
-        generator = ReportGenerator(str(self.pdf_output))
-        pdf_path = generator.generer(zones, metadata)
+        if "link" not in self.etapes:
+            return zones, 0
+        index_plans = {num: index for partiel in partiels for num, index in partiel.index_plans.items()}
+        logger.info(f"✓ {len(index_plans)} pages de plans indexées: {sorted(index_plans)}")
+        zones_liees = sum(1 for zone in zones if PlanDetector.lier_zone_par_index(zone, index_plans))
+        logger.info(f"✓ Liaison terminée: {zones_liees}/{len(zones)} zones liées à un plan")
+        return zones, zones_liees
+    
+    # Intervalle de vérification que le processus d'extraction est toujours vivant
+    DELAI_SONDAGE_FILE_S = 1.0
+    
+    def _analyser_en_pipeline(self, budget: BudgetTemps, profil: str, empreintes, precedent, pages_a_scanner):
+        """
+        Étapes 1 à 3 en pipeline : un processus extrait les pages et pousse leurs
+        zones dans une file bornée ; pendant ce temps, le processus principal
+        identifie les pages de plans puis lie chaque zone dès réception. Les crops
+        sont rendus une fois la file vidée, les zones voisines d'un plan partageant
+        le même crop.
+        
+        La liaison et les crops partagent le même fil d'exécution car PyMuPDF
+        n'est pas thread-safe ; l'extraction (pdfplumber) tourne à côté. La file
+        bornée bloque l'extracteur si la liaison prend du retard (mémoire stable).
+        
+        Returns:
+            Même tuple que _analyser_en_sequence
+        """
+        import multiprocessing
+        import queue
+        from contextlib import nullcontext
+        
+        ctx = multiprocessing.get_context()
+        file = ctx.Queue(maxsize=self.taille_file)
+        extracteur = ctx.Process(
+            target=_extraire_vers_file,
+            args=(self.pdf_path, pages_a_scanner, file, budget, profil),
+            daemon=True
+        )
+        extracteur.start()
+        
+        avec_crops = "crop" in self.etapes and not self.crops_paresseux
+        zones_par_page: Dict[int, List[ZoneDangereuse]] = {}
+        zones_extraites = {}
+        zones_traitees: Dict[str, ZoneDangereuse] = {}  # Première occurrence de chaque ID
+        crops_generes = 0
+        
+        try:
+            crops_dir = None if self.en_memoire else str(self.crops_dir)
+            with PlanDetector(self.pdf_path, empreintes,
+                              precedent.pages if precedent else None, budget) as detector, \
+                    (ImageCropper(self.pdf_path, crops_dir, budget) if avec_crops else nullcontext()) as cropper:
+                # Classification des plans pendant que l'extraction démarre
+                pages_plans = detector.identifier_pages_plans()
+                
+                a_generer: List[ZoneDangereuse] = []
+                
+                def traiter_page(page_num: int, zones_page: List[ZoneDangereuse]):
+                    nonlocal crops_generes
+                    zones_par_page[page_num] = zones_page
+                    if empreintes is not None:
+                        # Sérialisé avant la liaison, qui modifie les zones
+                        zones_extraites[empreintes[page_num - 1]] = [z.to_dict() for z in zones_page]
+                    for zone in zones_page:
+                        if zone.id_zone in zones_traitees:
+                            continue
+                        zones_traitees[zone.id_zone] = zone
+                        if detector.lier_zone(zone, pages_plans) and avec_crops:
+                            a_generer.append(zone)
+                
+                if empreintes is not None:
+                    for page_num, zones_page in sorted(
+                            self._zones_par_page_precedentes(empreintes, precedent, pages_a_scanner).items()):
+                        traiter_page(page_num, zones_page)
+                
+                while True:
+                    try:
+                        message = file.get(timeout=self.DELAI_SONDAGE_FILE_S)
+                    except queue.Empty:
+                        if extracteur.is_alive():
+                            continue
+                        # Processus tué sans message de fin (OOM, segfault) : ne pas attendre
+                        # indéfiniment, après un dernier essai pour les messages déjà émis
+                        try:
+                            message = file.get(timeout=self.DELAI_SONDAGE_FILE_S)
+                        except queue.Empty:
+                            raise RuntimeError(
+                                f"Échec de l'extraction: processus terminé (code {extracteur.exitcode})"
+                            )
+                    if message is None:
+                        break
+                    if isinstance(message, str):
+                        raise RuntimeError(f"Échec de l'extraction: {message}")
+                    if message[0] == "degradations":
+                        budget.degradations.extend(message[1])
+                        for etape, cles in message[2].items():
+                            budget.degrades.setdefault(etape, set()).update(cles)
+                        continue
+                    traiter_page(*message)
+                
+                if avec_crops:
+                    # Reprise décidée par groupe, une fois toutes les zones liées
+                    restants = self._crops_precedents(a_generer, empreintes, precedent)
+                    crops_generes += len(a_generer) - len(restants)
+                    crops_generes += cropper.generer_tous_les_crops(restants)
+            
+            extracteur.join()
+        finally:
+            if extracteur.is_alive():
+                extracteur.terminate()
+                extracteur.join()
+        
+        # Même dédoublonnage qu'en séquentiel ; les doublons reprennent la liaison de l'ID
+        zones = TextExtractor.dedoublonner(zones_par_page)
+        for zone in zones:
+            reference = zones_traitees[zone.id_zone]
+            zone.plan_page = reference.plan_page
+            zone.plan_bbox = reference.plan_bbox
+            zone.plan_piece = reference.plan_piece
+            zone.plan_crop_path = reference.plan_crop_path
+        
+        zones_liees = sum(1 for zone in zones if zone.plan_bbox)
+        logger.info(f"✓ Pipeline terminé: {zones_liees}/{len(zones)} zones liées, {crops_generes} crops")
+        crops_memoire = cropper.crops if avec_crops else {}
+        zones_avec_plans = crops_generes if avec_crops else zones_liees
+        return zones, zones_extraites, detector.resultats_pages, crops_memoire, zones_avec_plans
+    
+    def analyser(self, partiels: Optional[List[ResultatPartiel]] = None) -> Dict:
+        """
+        Pipeline d'analyse, limité aux étapes sélectionnées.
+        
+        Args:
+            partiels: Résultats de analyser_plage() couvrant tout le document ;
+                remplacent l'extraction et la liaison (fusion d'une analyse répartie)
+        
+        Returns:
+            Dictionnaire avec résultats et statistiques
+        """
+        from datetime import datetime
+        
+        logger.info("="*80)
+        logger.info("DÉMARRAGE ANALYSE RAPPORT AMIANTE")
+        logger.info(f"Étapes: {', '.join(self.etapes)}")
+        logger.info("="*80)
+        
+        profiler = StageProfiler(str(self.profile_dir) if self.profile_dir else None,
+                                 allocations=self.profile_allocations)
+        budget = BudgetTemps(self.budget_document_s, self.budget_page_s)
+        
+        # Profil laboratoire résolu une fois, puis imposé à toutes les extractions
+        profil = partiels[0].profil if partiels else self._resoudre_profil()
+        
+        # Mode incrémental: pages déjà connues de la révision précédente
+        empreintes = None
+        precedent = None
+        pages_a_scanner = None
+        if self.store_path and partiels:
+            logger.warning("Store incrémental ignoré lors d'une fusion de résultats partiels")
+        elif self.store_path:
+            precedent = PageResultStore.charger(str(self.store_path))
+            empreintes = PageResultStore.calculer_empreintes(self.pdf_path)
+            if precedent.profil != profil:
+                # Zones extraites avec d'autres patterns : rien n'est réutilisable
+                precedent.pages = {}
+            pages_a_scanner = [num for num, e in enumerate(empreintes, start=1) if e not in precedent.pages]
+            logger.info(f"Mode incrémental: {len(pages_a_scanner)}/{len(empreintes)} page(s) à ré-analyser")
+        
+        if partiels:
+            logger.info(f"\n[ÉTAPES 1-2/4] Fusion de {len(partiels)} résultat(s) partiel(s)")
+            logger.info("-" * 80)
+            
+            zones_extraites, resultats_plans = {}, {}
+            zones, _ = self._fusionner(partiels)
+            for partiel in partiels:
+                budget.degradations.extend(partiel.degradations)
+            crops_memoire, zones_avec_plans = self._generer_crops(profiler, zones, budget)
+        elif self.pipeline and "link" in self.etapes:
+            # Étapes 1 à 3 en parallèle, reliées par une file bornée
+            logger.info("\n[ÉTAPES 1-3/4] Extraction, liaison et crops en pipeline")
+            logger.info("-" * 80)
+            
+            with profiler.etape("pipeline"):
+                zones, zones_extraites, resultats_plans, crops_memoire, zones_avec_plans = \
+                    self._analyser_en_pipeline(budget, profil, empreintes, precedent, pages_a_scanner)
+        else:
+            zones, zones_extraites, resultats_plans, crops_memoire, zones_avec_plans = \
+                self._analyser_en_sequence(profiler, budget, profil, empreintes, precedent, pages_a_scanner)
+        
+        if not zones:
+            logger.error("❌ Aucune zone dangereuse détectée. Vérifier le format du PDF.")
+            return {"error": "Aucune zone détectée"}
+        
+        if "crop" in self.etapes and self.crops_paresseux:
+            crops_dir = None if self.en_memoire else str(self.crops_dir)
+            crops_memoire = CropsParesseux(self.pdf_path, zones, crops_dir, budget)
+        
+        plan_tiles: Dict[int, str] = {}
+        if "crop" in self.etapes and self.tiles_dir:
+            if budget.epuise():
+                budget.degrader("tiles", "tuiles ignorées")
+            else:
+                with profiler.etape("tiles"):
+                    plan_tiles = PlanTileCache(str(self.tiles_dir)).generer_pour_zones(self.pdf_path, zones)
+        
+        # Étape 4: Génération du rapport PDF
+        pdf_path = None
+        if "report" in self.etapes:
+            logger.info("\n[ÉTAPE 4/4] Génération de la fiche réflexe")
+            logger.info("-" * 80)
+            
+            with profiler.etape("report"):
+                if partiels:
+                    total_pages = partiels[0].total_pages
+                elif self._probe:
+                    total_pages = self._probe.total_pages
+                elif empreintes is not None:
+                    total_pages = len(empreintes)
+                else:
+                    with ouvrir_fitz(self.pdf_path) as doc:
+                        total_pages = len(doc)
+                
+                metadata = ReportMetadata(
+                    filename=self.filename,
+                    total_pages=total_pages,
+                    zones_detectees=len(zones),
+                    zones_avec_plans=zones_avec_plans,
+                    date_traitement=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                )
+                
+                generator = ReportGenerator(None if self.en_memoire else str(self.pdf_output),
+                                            crops=crops_memoire,
+                                            mode_plans=self.mode_plans,
+                                            source_pdf=self.pdf_path)
+                pdf_path = generator.generer(zones, metadata)
+        else:
+            logger.info("\n[ÉTAPE 4/4] Fiche réflexe: ignorée")
+        
+        annote = None
+        if self.rapport_annote:
+            with profiler.etape("annotate"):
+                annote = AnnotateurRapport(self.pdf_path, None if self.en_memoire else str(self.annote_output)
+                                           ).annoter(zones)
         
         # Sauvegarde JSON
         zones_dict = [zone.to_dict() for zone in zones]
-        with open(self.json_output, 'w', encoding='utf-8') as f:
-            json.dump(zones_dict, f, ensure_ascii=False, indent=2)
-        
-        logger.info(f"✓ Données JSON sauvegardées: {self.json_output}")
+        artifacts = None
+        if self.en_memoire:
+            artifacts = {
+                "pdf": pdf_path,
+                "json": json.dumps(zones_dict, ensure_ascii=False, indent=2),
+                "crops": crops_memoire,
+                "rapport_annote": annote,
+            }
+            pdf_path = None
+            annote = None
+        else:
+            with open(self.json_output, 'w', encoding='utf-8') as f:
+                json.dump(zones_dict, f, ensure_ascii=False, indent=2)
+            
+            logger.info(f"✓ Données JSON sauvegardées: {self.json_output}")
+        
+        # Store incrémental et diff avec la révision précédente
+        diff = None
+        if precedent:
+            if precedent.zones:
+                diff = PageResultStore.comparer_zones(precedent.zones, zones_dict)
+                logger.info(
+                    f"✓ Diff révision: +{len(diff['ajoutees'])} -{len(diff['supprimees'])} "
+                    f"~{len(diff['modifiees'])} ={diff['inchangees']}"
+                )
+            
+            store = PageResultStore(str(self.store_path))
+            # Pages extraites en mode dégradé : non conservées, ré-analysées la prochaine fois
+            empreintes_degradees = {
+                empreinte for num, empreinte in enumerate(empreintes, start=1)
+                if budget.est_degrade("extract", num)
+            }
+            for empreinte in empreintes:
+                if empreinte in empreintes_degradees:
+                    continue
+                # Les résultats d'une empreinte restent valides même si l'étape n'a pas tourné
+                plan = resultats_plans.get(empreinte) or precedent.pages.get(empreinte, {})
+                store.pages[empreinte] = {
+                    "zones": zones_extraites[empreinte],
+                    "est_plan": plan.get("est_plan"),
+                    "recherches": {
+                        id_zone: trouve for id_zone, trouve in plan.get("recherches", {}).items()
+                        if not (trouve and trouve.get("degrade"))
+                    },
+                }
+            store.zones = zones_dict
+            store.profil = profil
+            # Groupe de chaque crop partagé : sa reprise est invalidée si le groupe change
+            groupes_crops: Dict[str, List[str]] = {}
+            for zone in zones:
+                if zone.plan_crop_path:
+                    groupes_crops.setdefault(zone.plan_crop_path, []).append(zone.id_zone)
+            store.crops = {
+                zone.id_zone: {
+                    "empreinte": empreintes[zone.plan_page - 1],
+                    "bbox": list(zone.plan_bbox),
+                    "path": zone.plan_crop_path,
+                    "groupe": sorted(groupes_crops[zone.plan_crop_path]),
+                }
+                for zone in zones if zone.plan_crop_path and not budget.est_degrade("crop", zone.id_zone)
+            }
+            store.sauvegarder()
+        
+        if isinstance(crops_memoire, CropsParesseux):
+            # Rendus suivants (affichage) hors du budget de l'analyse
+            crops_memoire.terminer_analyse()
         
         # Résumé
         logger.info("\n" + "="*80)
         logger.info("ANALYSE TERMINÉE")
         logger.info("="*80)
         logger.info(f"✓ Zones dangereuses détectées: {len(zones)}")
-        logger.info(f"✓ Zones avec plan localisé: {crops_count}")
-        logger.info(f"✓ Fiche réflexe PDF: {pdf_path}")
-        logger.info(f"✓ Données JSON: {self.json_output}")
+        logger.info(f"✓ Zones avec plan localisé: {zones_avec_plans}")
+        if pdf_path:
+            logger.info(f"✓ Fiche réflexe PDF: {pdf_path}")
+        if not self.en_memoire:
+            logger.info(f"✓ Données JSON: {self.json_output}")
+        if annote:
+            logger.info(f"✓ Rapport annoté: {annote}")
         
         return {
             "success": True,
+            "stages": list(self.etapes),
+            "profil_laboratoire": profil,
             "zones_count": len(zones),
-            "zones_with_plan": crops_count,
-            "pdf_output": str(pdf_path),
-            "json_output": str(self.json_output),
+            "zones_with_plan": zones_avec_plans,
+            "pdf_output": str(pdf_path) if pdf_path else None,
+            "json_output": None if self.en_memoire else str(self.json_output),
+            "annotated_output": annote,
+            "tiles_dir": str(self.tiles_dir) if self.tiles_dir else None,
+            "plan_tiles": {str(page): empreinte for page, empreinte in plan_tiles.items()},
+            "diff": diff,
+            "profiling": profiler.resultats if profiler.actif else None,
+            "artifacts": artifacts,
+            "budget": {
+                "document_s": self.budget_document_s,
+                "page_s": self.budget_page_s,
+                "ecoule_s": round(budget.ecoule(), 3),
+            },
+            "degradations": budget.degradations,
             "zones": zones_dict
         }
 
 
+def analyser_televersement(contenu: bytes, filename: str) -> Dict:
+    """
+    Analyse d'un rapport téléversé, telle que lancée par l'application Streamlit :
+    en mémoire, crops à la demande. Les tuiles des plans ne sont pas générées ici,
+    l'application les produit à l'ouverture de l'explorateur d'un plan.
+    """
+    analyzer = AsbestosReportAnalyzer(
+        contenu,
+        filename=filename,
+        en_memoire=True,
+        crops_paresseux=True
+    )
+    return analyzer.analyser()
+
+
 # ============================================================================
 # POINT D'ENTRÉE
 # ============================================================================
 
 def main():
     """Point d'entrée du script"""
+    import argparse
     import sys
     
-    if len(sys.argv) < 2:
-        print("Usage: python asbestos_report_analyzer.py <chemin_rapport.pdf>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Extraction des zones amiante d'un rapport DTA/RAAT"
+    )
+    parser.add_argument("pdf_path", help="Chemin du rapport PDF")
+    parser.add_argument("--output-dir", default="/home/claude",
+                        help="Dossier de sortie (JSON, crops, fiche PDF)")
+    parser.add_argument("--stages", default=None,
+                        help=f"Étapes à exécuter, séparées par des virgules ({','.join(ETAPES)}) ; "
+                             f"toutes par défaut, sauf crop avec --plans vecteur")
+    parser.add_argument("--tiles-dir", default=None,
+                        help="Dossier du cache de tuiles des plans (pan/zoom)")
+    parser.add_argument("--store", default=None,
+                        help="Store JSON par page : ré-analyse incrémentale d'une révision")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Extraction en parallèle de la liaison et des crops")
+    parser.add_argument("--budget-document", type=float, default=None,
+                        help="Budget de temps du document (s) avant dégradation")
+    parser.add_argument("--budget-page", type=float, default=None,
+                        help="Budget de temps par page (s) avant dégradation")
+    parser.add_argument("--lab-profile", default=None, choices=sorted(PROFILS_LABORATOIRES),
+                        help="Impose le format d'IDs du laboratoire (détection automatique sinon)")
+    parser.add_argument("--plans", default="raster", choices=["raster", "vecteur"],
+                        help="Plans de la fiche : crops PNG ou extraits vectoriels du PDF source")
+    parser.add_argument("--lazy-crops", action="store_true",
+                        help="Ne rend que les crops utilisés par la fiche (à la demande)")
+    parser.add_argument("--annotate", action="store_true",
+                        help="Exporte aussi le rapport original annoté (<output-dir>/rapport_annote.pdf)")
+    parser.add_argument("--shard", default=None, metavar="DEBUT-FIN",
+                        help="Analyse partielle d'une plage de pages, écrite en JSON dans <output-dir>")
+    parser.add_argument("--merge", nargs="+", default=None, metavar="PARTIEL_JSON",
+                        help="Fusionne des résultats partiels (--shard) au lieu d'extraire")
+    parser.add_argument("--probe", action="store_true",
+                        help="Affiche le sondage de structure (JSON) sans lancer l'analyse")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile le temps de chaque étape (cProfile) dans <output-dir>/profiling")
+    parser.add_argument("--profile-allocations", action="store_true",
+                        help="Passe séparée : allocations Python de chaque étape (tracemalloc, "
+                             "durées fortement gonflées) dans <output-dir>/profiling")
+    args = parser.parse_args()
     
-    pdf_path = sys.argv[1]
+    pdf_path = args.pdf_path
     
     if not Path(pdf_path).exists():
         print(f"Erreur: Le fichier {pdf_path} n'existe pas")
         sys.exit(1)
     
+    try:
+        etapes = normaliser_etapes(args.stages) if args.stages else None
+    except ValueError as e:
+        parser.error(str(e))
+    
+    if args.probe:
+        probe = AsbestosReportAnalyzer(pdf_path, output_dir=args.output_dir, en_memoire=True).probe()
+        print(json.dumps(probe.to_dict(), ensure_ascii=False, indent=2))
+        return
+    
     # Lancement de l'analyse
-    analyzer = AsbestosReportAnalyzer(pdf_path)
-    result = analyzer.analyser()
+    analyzer = AsbestosReportAnalyzer(pdf_path, output_dir=args.output_dir, etapes=etapes,
+                                      tiles_dir=args.tiles_dir, store_path=args.store,
+                                      profile=args.profile, profile_allocations=args.profile_allocations,
+                                      pipeline=args.pipeline,
+                                      budget_document_s=args.budget_document,
+                                      budget_page_s=args.budget_page,
+                                      profil_laboratoire=args.lab_profile,
+                                      mode_plans=args.plans,
+                                      crops_paresseux=args.lazy_crops,
+                                      rapport_annote=args.annotate)
+    if args.shard:
+        try:
+            debut, fin = (int(borne) for borne in args.shard.split("-"))
+        except ValueError:
+            parser.error(f"Plage de pages invalide: {args.shard} (attendu DEBUT-FIN)")
+        try:
+            partiel = analyzer.analyser_plage(debut, fin)
+        except ValueError as e:
+            parser.error(str(e))
+        chemin = Path(args.output_dir) / f"partiel_{debut:05d}-{fin:05d}.json"
+        with open(chemin, 'w', encoding='utf-8') as f:
+            json.dump(partiel.to_dict(), f, ensure_ascii=False, indent=2)
+        print(f"📦 Résultat partiel: {chemin}")
+        return
+    
+    partiels = None
+    if args.merge:
+        partiels = []
+        for chemin in args.merge:
+            with open(chemin, encoding='utf-8') as f:
+                partiels.append(ResultatPartiel.from_dict(json.load(f)))
+    try:
+        result = analyzer.analyser(partiels)
+    except ValueError as e:
+        parser.error(str(e))
     
     if result.get("success"):
         print("\n✅ Analyse réussie!")
-        print(f"📄 Fiche réflexe: {result['pdf_output']}")
+        if result["pdf_output"]:
+            print(f"📄 Fiche réflexe: {result['pdf_output']}")
         print(f"📊 Données JSON: {result['json_output']}")
+        if result["annotated_output"]:
+            print(f"🖍️ Rapport annoté: {result['annotated_output']}")
     else:
         print("\n❌ Échec de l'analyse")
         sys.exit(1)
@@ -0,0 +1,329 @@
+"""
+Test de charge de l'analyse telle que lancée par l'application Streamlit
+========================================================================
+
+N utilisateurs simulés soumettent en boucle des rapports synthétiques à
+analyser_televersement() (le point d'entrée de app.py), puis affichent la
+première page de zones, ce qui déclenche le rendu de leurs crops. Les
+utilisateurs sont des threads d'un même processus, comme les sessions d'une
+instance Streamlit.
+
+Pour chaque niveau de concurrence, le rapport JSON relève les latences
+p50/p95/p99, le débit, les erreurs et la mémoire résidente (RSS). Il se
+compare d'une version à l'autre avec --comparer.
+
+Usage:
+    python load_test.py --utilisateurs 1,4,8 --requetes 3 --sortie charge_v1.json
+    python load_test.py --utilisateurs 1,4,8 --sortie charge_v2.json --comparer charge_v1.json
+"""
+
+import json
+import math
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from asbestos_report_analyzer import analyser_televersement, logger
+
+# Zones affichées par l'application avant pagination (ZONES_PAR_PAGE de app.py)
+ZONES_AFFICHEES = 10
+
+# Jeu de rapports synthétiques : (nom, pages de texte, pages de plans, zones positives)
+RAPPORTS_SYNTHETIQUES = [
+    ("petit", 8, 2, 12),
+    ("moyen", 40, 6, 48),
+    ("grand", 150, 12, 120),
+]
+
+MATERIAUX = ["Dalle de sol", "Colle de faïence", "Enduit plâtre", "Calorifugeage tuyau", "Plaque de plafond"]
+PIECES = ["Cuisine", "Salon", "Couloir", "Chambre", "Cave", "Chaufferie", "Bureau", "Sanitaires"]
+
+
+# ============================================================================
+# RAPPORTS SYNTHÉTIQUES
+# ============================================================================
+
+def generer_rapport_synthetique(pages_texte: int, pages_plans: int, nb_zones: int, graine: int = 0) -> bytes:
+    """
+    Rapport DTA synthétique : pages de texte courant, tableaux de prélèvements
+    (positifs et négatifs) et plans paysage avec IDs, pièces et tracés.
+    """
+    import fitz
+
+    aleatoire = random.Random(graine)
+    doc = fitz.open()
+
+    # Pages de garde et texte courant
+    pages_tableaux = max(1, math.ceil(nb_zones / 25))
+    for num in range(pages_texte - pages_tableaux):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Diagnostic technique amiante - section {num + 1}", fontsize=14)
+        for ligne in range(30):
+            page.insert_text((72, 110 + ligne * 20), f"Observation {num}.{ligne} : repérage visuel sans objet.")
+
+    # Tableaux de prélèvements : une ligne positive par zone, quelques négatifs
+    ids = [f"P{100 + i}" for i in range(nb_zones)]
+    for num in range(pages_tableaux):
+        page = doc.new_page()
+        page.insert_text((72, 72), "Résultats des prélèvements", fontsize=14)
+        y = 110
+        for id_zone in ids[num * 25:(num + 1) * 25]:
+            etat = aleatoire.choice(["dégradé", "bon état"])
+            page.insert_text((72, y), f"{id_zone}  {aleatoire.choice(MATERIAUX)}  "
+                                      f"{aleatoire.choice(PIECES)}  Présence amiante  {etat}", fontsize=9)
+            y += 18
+        page.insert_text((72, y), f"N{num}01  Enduit  Résultat négatif - absence", fontsize=9)
+
+    # Plans : cloisons vectorielles, libellés de pièces et IDs répartis
+    for num in range(pages_plans):
+        page = doc.new_page(width=1191, height=842)
+        page.insert_text((40, 40), f"Plan niveau {num} - Légende: {' '.join(ids[:4])}", fontsize=8)
+        for _ in range(150):
+            x, y = aleatoire.uniform(60, 1100), aleatoire.uniform(80, 780)
+            page.draw_rect(fitz.Rect(x, y, x + aleatoire.uniform(20, 120), y + aleatoire.uniform(20, 90)))
+        for id_zone in ids[num::pages_plans]:
+            x, y = aleatoire.uniform(80, 1100), aleatoire.uniform(100, 800)
+            page.insert_text((x, y), id_zone, fontsize=7)
+            page.insert_text((x + 5, y + 14), aleatoire.choice(PIECES), fontsize=7)
+
+    # Un flux de contenu par page, comme les rapports réels (insert_text en ajoute un par appel)
+    for page in doc:
+        page.clean_contents()
+
+    contenu = doc.tobytes()
+    doc.close()
+    return contenu
+
+
+# ============================================================================
+# MESURES
+# ============================================================================
+
+def rss_courant() -> int:
+    """Mémoire résidente du processus (octets)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # Hors Linux : pic depuis le démarrage (Ko sous Linux, octets sous macOS)
+        pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pic if sys.platform == "darwin" else pic * 1024
+
+
+class EchantillonneurRSS:
+    """Relève la RSS en tâche de fond pendant un palier de charge"""
+
+    def __init__(self, intervalle_s: float = 0.05):
+        self.intervalle_s = intervalle_s
+        self.pic = 0
+        self._arret = threading.Event()
+        self._thread = threading.Thread(target=self._boucle, daemon=True)
+
+    def _boucle(self):
+        while not self._arret.is_set():
+            self.pic = max(self.pic, rss_courant())
+            self._arret.wait(self.intervalle_s)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._arret.set()
+        self._thread.join()
+        self.pic = max(self.pic, rss_courant())
+
+
+def percentile(valeurs: List[float], rang: float) -> Optional[float]:
+    """Percentile au rang le plus proche (valeur réellement observée)"""
+    if not valeurs:
+        return None
+    valeurs = sorted(valeurs)
+    return valeurs[max(0, math.ceil(rang / 100 * len(valeurs)) - 1)]
+
+
+# ============================================================================
+# SCÉNARIO
+# ============================================================================
+
+def session_utilisateur(rapports: List[Tuple[str, bytes]], requetes: int, decalage: int,
+                        mesures: List[Dict]):
+    """Un utilisateur : téléversements successifs, puis affichage de la première page de zones"""
+    for i in range(requetes):
+        nom, contenu = rapports[(decalage + i) % len(rapports)]
+        debut = time.perf_counter()
+        erreur = None
+        try:
+            resultat = analyser_televersement(contenu, f"{nom}.pdf")
+            if "error" in resultat:
+                erreur = resultat["error"]
+            else:
+                crops = resultat["artifacts"]["crops"]
+                for zone in resultat["zones"][:ZONES_AFFICHEES]:
+                    crops.get(zone["id_zone"])
+                crops.fermer()
+        except Exception as e:
+            erreur = f"{type(e).__name__}: {e}"
+        mesures.append({
+            "rapport": nom,
+            "latence_s": time.perf_counter() - debut,
+            "erreur": erreur,
+        })
+
+
+def executer_palier(rapports: List[Tuple[str, bytes]], utilisateurs: int, requetes: int) -> Dict:
+    """N utilisateurs simultanés"""
+    mesures: List[Dict] = []
+    rss_depart = rss_courant()
+
+    sessions = [
+        threading.Thread(target=session_utilisateur,
+                         args=(rapports, requetes, u, mesures))
+        for u in range(utilisateurs)
+    ]
+    with EchantillonneurRSS() as rss:
+        debut = time.perf_counter()
+        for session in sessions:
+            session.start()
+        for session in sessions:
+            session.join()
+        duree = time.perf_counter() - debut
+
+    latences = [m["latence_s"] for m in mesures if not m["erreur"]]
+    par_rapport = {}
+    for nom, _ in rapports:
+        latences_rapport = [m["latence_s"] for m in mesures if m["rapport"] == nom and not m["erreur"]]
+        if latences_rapport:
+            par_rapport[nom] = {
+                "requetes": len(latences_rapport),
+                "p50_s": round(percentile(latences_rapport, 50), 3),
+                "p95_s": round(percentile(latences_rapport, 95), 3),
+            }
+
+    arrondi = lambda valeur: round(valeur, 3) if valeur is not None else None
+    return {
+        "utilisateurs": utilisateurs,
+        "requetes": len(mesures),
+        "erreurs": [m["erreur"] for m in mesures if m["erreur"]],
+        "duree_s": round(duree, 3),
+        "debit_rps": round(len(latences) / duree, 3) if duree else None,
+        "p50_s": arrondi(percentile(latences, 50)),
+        "p95_s": arrondi(percentile(latences, 95)),
+        "p99_s": arrondi(percentile(latences, 99)),
+        "max_s": arrondi(max(latences) if latences else None),
+        "rss_depart_mo": round(rss_depart / 2**20, 1),
+        "rss_pic_mo": round(rss.pic / 2**20, 1),
+        "rss_fin_mo": round(rss_courant() / 2**20, 1),
+        "par_rapport": par_rapport,
+    }
+
+
+def version_code() -> str:
+    """Révision git du code testé (si disponible)"""
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=Path(__file__).parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "inconnue"
+
+
+def comparer(rapport: Dict, reference: Dict):
+    """Affiche l'évolution de chaque palier commun par rapport à une exécution de référence"""
+    paliers_reference = {palier["utilisateurs"]: palier for palier in reference["paliers"]}
+    print(f"\nComparaison avec {reference['version']} ({reference['date']})")
+    print(f"{'users':>6} {'métrique':>12} {'référence':>10} {'actuel':>10} {'écart':>8}")
+    for palier in rapport["paliers"]:
+        ancien = paliers_reference.get(palier["utilisateurs"])
+        if not ancien:
+            continue
+        for metrique in ("p50_s", "p95_s", "p99_s", "debit_rps", "rss_pic_mo"):
+            avant, apres = ancien.get(metrique), palier.get(metrique)
+            ecart = f"{(apres - avant) / avant:+.0%}" if avant and apres is not None else "-"
+            print(f"{palier['utilisateurs']:>6} {metrique:>12} {avant!s:>10} {apres!s:>10} {ecart:>8}")
+
+
+# ============================================================================
+# POINT D'ENTRÉE
+# ============================================================================
+
+def main():
+    """Point d'entrée du script"""
+    import argparse
+    import logging
+    from datetime import datetime
+
+    parser = argparse.ArgumentParser(
+        description="Test de charge de l'analyse (utilisateurs simultanés de app.py)"
+    )
+    parser.add_argument("--utilisateurs", default="1,2,4,8",
+                        help="Paliers d'utilisateurs simultanés, séparés par des virgules")
+    parser.add_argument("--requetes", type=int, default=3,
+                        help="Téléversements successifs par utilisateur")
+    parser.add_argument("--rapports", default=",".join(nom for nom, *_ in RAPPORTS_SYNTHETIQUES),
+                        help="Rapports synthétiques utilisés (petit, moyen, grand)")
+    parser.add_argument("--sortie", default="charge.json",
+                        help="Rapport JSON de l'exécution")
+    parser.add_argument("--comparer", default=None,
+                        help="Rapport JSON d'une exécution précédente à comparer")
+    args = parser.parse_args()
+
+    try:
+        paliers = [int(n) for n in args.utilisateurs.split(",")]
+    except ValueError:
+        parser.error(f"Paliers invalides: {args.utilisateurs}")
+    definitions = {nom: (pages, plans, zones) for nom, pages, plans, zones in RAPPORTS_SYNTHETIQUES}
+    noms = [nom.strip() for nom in args.rapports.split(",") if nom.strip()]
+    inconnus = [nom for nom in noms if nom not in definitions]
+    if inconnus or not noms:
+        parser.error(f"Rapports inconnus: {', '.join(inconnus)} (valeurs possibles: {', '.join(definitions)})")
+
+    # Les journaux de l'analyse fausseraient les mesures
+    logger.setLevel(logging.WARNING)
+
+    rapports = [(nom, generer_rapport_synthetique(*definitions[nom], graine=i)) for i, nom in enumerate(noms)]
+    for nom, contenu in rapports:
+        print(f"Rapport synthétique {nom}: {len(contenu) / 1024:.0f} Ko")
+
+    # Première analyse hors mesure (imports paresseux, polices)
+    analyser_televersement(rapports[0][1], "chauffe.pdf")
+
+    rapport = {
+        "version": version_code(),
+        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "machine": {
+            "python": platform.python_version(),
+            "plateforme": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "requetes_par_utilisateur": args.requetes,
+        "rapports": {nom: {"pages": sum(definitions[nom][:2]), "zones": definitions[nom][2], "octets": len(contenu)}
+                     for nom, contenu in rapports},
+        "paliers": [],
+    }
+
+    print(f"\n{'users':>6} {'req':>5} {'err':>4} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'req/s':>7} {'RSS pic Mo':>11}")
+    for utilisateurs in paliers:
+        palier = executer_palier(rapports, utilisateurs, args.requetes)
+        rapport["paliers"].append(palier)
+        print(f"{utilisateurs:>6} {palier['requetes']:>5} {len(palier['erreurs']):>4} "
+              f"{palier['p50_s']!s:>7} {palier['p95_s']!s:>7} {palier['p99_s']!s:>7} "
+              f"{palier['debit_rps']!s:>7} {palier['rss_pic_mo']:>11}")
+
+    with open(args.sortie, 'w', encoding='utf-8') as f:
+        json.dump(rapport, f, ensure_ascii=False, indent=2)
+    print(f"\n📊 Rapport de charge: {args.sortie}")
+
+    if args.comparer:
+        with open(args.comparer, encoding='utf-8') as f:
+            comparer(rapport, json.load(f))
+
+
+if __name__ == "__main__":
+    main()